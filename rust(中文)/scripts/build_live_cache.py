@@ -6,51 +6,88 @@ CRONTAB ENTRY (add to crontab -e):
 # Update live cache every 2 minutes
 */2 * * * * cd <PROJECT_ROOT>/rust_clob_client && python3 scripts/build_live_cache.py >> /tmp/live_cache.log 2>&1
 """
+import asyncio
+import hashlib
 import json
-import urllib.request
+import os
 from datetime import datetime
+from pathlib import Path
 
-GAMMA_API = "https://gamma-api.polymarket.com"
-
-def fetch_all_events():
-    """Fetch ALL sports events with pagination"""
-    all_events = []
-    offset = 0
-    limit = 500
-
-    while True:
-        url = f"{GAMMA_API}/events?tag_id=1&active=true&closed=false&limit={limit}&offset={offset}"
-        req = urllib.request.Request(url, headers={
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
-            'Accept': 'application/json',
-        })
+import aiohttp
 
-        try:
-            with urllib.request.urlopen(req, timeout=30) as response:
-                events = json.loads(response.read().decode('utf-8'))
-        except Exception as e:
-            print(f"Error fetching events at offset {offset}: {e}")
-            break
+try:
+    import orjson  # optional, much faster than the stdlib json module
+except ImportError:
+    orjson = None
 
-        if not events:
-            break
 
-        all_events.extend(events)
+def json_loads(raw):
+    return orjson.loads(raw) if orjson else json.loads(raw)
 
-        if len(events) < limit:
-            break
-        offset += limit
 
-    return all_events
+def json_dumps_bytes(obj) -> bytes:
+    return orjson.dumps(obj) if orjson else json.dumps(obj).encode()
 
-def main():
-    events = fetch_all_events()
+GAMMA_API = "https://gamma-api.polymarket.com"
+MAX_PARALLEL_PAGES = 8
+CACHE_FILE = ".live_cache.json"
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
+    'Accept': 'application/json',
+    'Accept-Encoding': 'gzip',
+}
+
+def write_atomic(path, payload):
+    """Atomically replace `path` with `payload`; returns False if content was unchanged."""
+    p = Path(path)
+    try:
+        if hashlib.blake2b(p.read_bytes()).digest() == hashlib.blake2b(payload).digest():
+            return False
+    except FileNotFoundError:
+        pass
+    tmp = p.with_name(p.name + ".tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, p)  # readers never see a partially written file
+    return True
+
+async def fetch_page(session, offset, limit):
+    """Fetch one page of sports events; None on error."""
+    params = {'tag_id': 1, 'active': 'true', 'closed': 'false', 'limit': limit, 'offset': offset}
+    try:
+        async with session.get(f"{GAMMA_API}/events", params=params) as response:
+            response.raise_for_status()
+            return json_loads(await response.read())
+    except Exception as e:
+        print(f"Error fetching events at offset {offset}: {e}")
+        return None
+
+async def iter_event_pages(session):
+    """Yield ALL sports event pages in order (pages after the first fetched in parallel)"""
+    limit = 500
 
-    if not events:
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Error: No events fetched")
+    first = await fetch_page(session, 0, limit)
+    if not first:
+        return
+    yield first
+    if len(first) < limit:
         return
 
-    live_map = {}
+    offset = limit
+    batch = 2
+    while True:
+        pages = await asyncio.gather(*(fetch_page(session, offset + i * limit, limit) for i in range(batch)))
+        for events in pages:
+            if not events:
+                return
+            yield events
+            if len(events) < limit:
+                return
+        offset += batch * limit
+        batch = min(batch * 2, MAX_PARALLEL_PAGES)
+
+def add_events(events, live_map):
+    """Merge one page of events into live_map; returns (live, not_live) token counts."""
     live_count = 0
     not_live_count = 0
 
@@ -62,22 +99,44 @@ def main():
                 continue
             clob_tokens_str = market.get("clobTokenIds", "[]")
             try:
-                tokens = json.loads(clob_tokens_str) if isinstance(clob_tokens_str, str) else clob_tokens_str
-                for token in tokens:
-                    if isinstance(token, str) and len(token) > 20:
-                        live_map[token] = is_live
-                        if is_live:
-                            live_count += 1
-                        else:
-                            not_live_count += 1
+                tokens = json_loads(clob_tokens_str) if isinstance(clob_tokens_str, str) else clob_tokens_str
+                new = {token: is_live for token in tokens if type(token) is str and len(token) > 20}
             except:
-                pass
+                continue
+            live_map.update(new)
+            if is_live:
+                live_count += len(new)
+            else:
+                not_live_count += len(new)
+
+    return live_count, not_live_count
+
+async def main():
+    live_map = {}
+    event_count = 0
+    live_count = 0
+    not_live_count = 0
+
+    # Each page is folded into live_map as soon as it arrives, so only the
+    # pages of the current batch are held in memory at once.
+    connector = aiohttp.TCPConnector(limit=MAX_PARALLEL_PAGES, ttl_dns_cache=600)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=REQUEST_HEADERS) as session:
+        async for events in iter_event_pages(session):
+            event_count += len(events)
+            live, not_live = add_events(events, live_map)
+            live_count += live
+            not_live_count += not_live
+
+    if not event_count:
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Error: No events fetched")
+        return
 
     # Save the cache
-    with open(".live_cache.json", "w") as f:
-        json.dump(live_map, f)
+    written = write_atomic(CACHE_FILE, json_dumps_bytes(live_map))
 
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] Events: {len(events)} | Live: {live_count} | Not live: {not_live_count} | Total tokens: {len(live_map)}")
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Events: {event_count} | Live: {live_count} | Not live: {not_live_count} | Total tokens: {len(live_map)}"
+          f"{'' if written else ' | unchanged'}")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -14,17 +14,48 @@ For background operation:
 """
 
 import asyncio
+import bisect
+import functools
+import hashlib
 import json
 import sqlite3
 import os
+import re
+import threading
+import zlib
+import time
 from dataclasses import dataclass, asdict
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable
 import aiohttp
 from aiohttp import web
 import logging
 
+try:
+    import orjson  # optional, much faster than the stdlib json module
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np  # optional, vectorizes the size-bucket analytics
+except ImportError:
+    np = None
+
+try:
+    import brotli  # optional, smaller precompressed dashboard page
+except ImportError:
+    brotli = None
+
+
+def json_loads(raw):
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+
+def json_dumps_bytes(obj) -> bytes:
+    return orjson.dumps(obj) if orjson else json.dumps(obj).encode()
+
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
@@ -40,8 +71,26 @@ SCALING_RATIO = 0.08  # 8%
 DATA_API_BASE = "https://data-api.polymarket.com"
 USER_PNL_API = "https://user-pnl-api.polymarket.com/user-pnl"
 DB_PATH = Path(__file__).parent / "divergence_data.db"
+POSITIONS_CACHE_PATH = Path(__file__).parent / "divergence_positions.json"
 WEB_PORT = 8765
 FETCH_INTERVAL = 60  # seconds
+POSITIONS_PAGE_CONCURRENCY = 8  # parallel /positions page requests per user
+# The background loop only refreshes positions while /api/positions was requested
+# this recently (covers the dashboard's 5-minute positions poll)
+POSITIONS_ACTIVE_SECONDS = 10 * FETCH_INTERVAL
+HISTORY_CACHE_TTL = 30  # seconds an encoded /api/history response is reused
+HISTORY_CACHE_SIZE = 16  # most (hours, width) /api/history responses kept at once
+# /api/history resolution: one snapshot per bucket of N minutes for ranges up to
+# the given number of hours (0 = every snapshot)
+HISTORY_RESOLUTION = ((24, 0), (24 * 7, 5))
+HISTORY_LONG_RANGE_MINUTES = 60
+MAX_HISTORY_HOURS = 24 * 90  # /api/history requests are clamped to this range
+# Pixel-aware (M4) downsampling when the dashboard sends its chart width
+HISTORY_MIN_PIXELS = 100
+HISTORY_MAX_PIXELS = 4000
+HISTORY_PIXEL_STEP = 100  # widths are rounded up to this to bound cache keys
+# Bucket widths (minutes) the SQL downsampling can group by, widest first
+HISTORY_SQL_BUCKETS = (60, 30, 20, 15, 12, 10, 6, 5, 4, 3, 2)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -54,90 +103,307 @@ logger = logging.getLogger(__name__)
 # =============================================================================
 # DATABASE
 # =============================================================================
+# One connection shared by the whole process; autocommit mode (isolation_level=None)
+# and a lock so concurrent callers don't interleave statements.
+_CONN: Optional[sqlite3.Connection] = None
+_DB_LOCK = threading.Lock()
+
+SQLITE_PRAGMAS = (
+    "PRAGMA page_size=4096",       # must precede the first CREATE TABLE to take effect
+    "PRAGMA journal_mode=WAL",     # readers no longer block the writer
+    "PRAGMA synchronous=NORMAL",   # WAL makes this safe; avoids an fsync per commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",    # 64 MiB page cache
+    "PRAGMA busy_timeout=60000",
+)
+
+
+def get_conn() -> sqlite3.Connection:
+    """Return the shared SQLite connection, opening it on first use."""
+    global _CONN
+    if _CONN is None:
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        _CONN = conn
+    return _CONN
+
+
+def close_db():
+    """Flush buffered snapshots and close the shared SQLite connection."""
+    global _CONN
+    with _DB_LOCK:
+        if _CONN is not None:
+            _flush_pending_locked()
+            _CONN.close()
+            _CONN = None
+
+
+SNAPSHOT_COLUMNS = (
+    'timestamp', 'user1_value', 'user1_pnl', 'user1_volume', 'user1_rank',
+    'user2_value', 'user2_pnl', 'user2_volume', 'user2_rank',
+    'expected_pnl', 'pnl_vs_expected', 'pnl_efficiency', 'scaling_ratio',
+)
+# Columns served by /api/history (what the dashboard charts plot)
+HISTORY_COLUMNS = (
+    'timestamp', 'user1_pnl', 'user2_pnl', 'expected_pnl', 'pnl_vs_expected', 'pnl_efficiency',
+)
+INSERT_SNAPSHOT_SQL = (
+    f"INSERT INTO snapshots ({', '.join(SNAPSHOT_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(SNAPSHOT_COLUMNS))})"
+)
+
+
+# Plain INTEGER PRIMARY KEY aliases the rowid; AUTOINCREMENT would add a
+# sqlite_sequence write to every insert for no benefit here.
+CREATE_SNAPSHOTS_SQL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY,
+        timestamp TEXT NOT NULL,
+        user1_value REAL,
+        user1_pnl REAL,
+        user1_volume REAL,
+        user1_rank INTEGER,
+        user2_value REAL,
+        user2_pnl REAL,
+        user2_volume REAL,
+        user2_rank INTEGER,
+        expected_pnl REAL,
+        pnl_vs_expected REAL,
+        pnl_efficiency REAL,
+        scaling_ratio REAL
+    )
+"""
+
+
+def _migrate_autoincrement(conn: sqlite3.Connection):
+    """Rebuild a snapshots table created with AUTOINCREMENT, keeping its rows."""
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'snapshots'"
+    ).fetchone()
+    if row is None or 'AUTOINCREMENT' not in row['sql'].upper():
+        return
+    logger.info("Migrating snapshots table to drop AUTOINCREMENT")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(CREATE_SNAPSHOTS_SQL.format(table='snapshots_new'))
+        conn.execute(f"""
+            INSERT INTO snapshots_new (id, {', '.join(SNAPSHOT_COLUMNS)})
+            SELECT id, {', '.join(SNAPSHOT_COLUMNS)} FROM snapshots
+        """)
+        conn.execute("DROP TABLE snapshots")
+        conn.execute("ALTER TABLE snapshots_new RENAME TO snapshots")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
 def init_db():
     """Initialize SQLite database."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS snapshots (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT NOT NULL,
-            user1_value REAL,
-            user1_pnl REAL,
-            user1_volume REAL,
-            user1_rank INTEGER,
-            user2_value REAL,
-            user2_pnl REAL,
-            user2_volume REAL,
-            user2_rank INTEGER,
-            expected_pnl REAL,
-            pnl_vs_expected REAL,
-            pnl_efficiency REAL,
-            scaling_ratio REAL
-        )
-    """)
-    conn.execute("""
-        CREATE INDEX IF NOT EXISTS idx_timestamp ON snapshots(timestamp)
-    """)
-    conn.commit()
-    conn.close()
+    with _DB_LOCK:
+        conn = get_conn()
+        _migrate_autoincrement(conn)
+        conn.execute(CREATE_SNAPSHOTS_SQL.format(table='snapshots'))
+        # Covering index for the history query, so charts are served by an
+        # index-only scan. Built here, after any existing rows are in place,
+        # rather than maintained during a bulk load; it supersedes idx_timestamp.
+        conn.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_snap_ts_cover
+            ON snapshots({', '.join(HISTORY_COLUMNS)})
+        """)
+        conn.execute("DROP INDEX IF EXISTS idx_timestamp")
     logger.info(f"Database initialized at {DB_PATH}")
 
 
+# Snapshots are buffered and written in one transaction every FLUSH_ROWS rows
+# or FLUSH_SECONDS, whichever comes first. Readers see pending rows too.
+FLUSH_ROWS = 32
+FLUSH_SECONDS = 300
+_PENDING: List[Dict[str, Any]] = []
+_LAST_FLUSH = time.monotonic()
+_SNAPSHOT_VERSION = 0  # bumped on every save; invalidates cached history responses
+
+
+def _flush_pending_locked():
+    """Write buffered snapshots in a single transaction. Caller holds _DB_LOCK."""
+    global _LAST_FLUSH
+    _LAST_FLUSH = time.monotonic()
+    if not _PENDING:
+        return
+    conn = get_conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(INSERT_SNAPSHOT_SQL,
+                         [tuple(d[c] for c in SNAPSHOT_COLUMNS) for d in _PENDING])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    _PENDING.clear()
+
+
+def flush_snapshots():
+    """Write any buffered snapshots to the database."""
+    with _DB_LOCK:
+        _flush_pending_locked()
+
+
 def save_snapshot(data: Dict[str, Any]):
-    """Save a snapshot to the database."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("""
-        INSERT INTO snapshots (
-            timestamp, user1_value, user1_pnl, user1_volume, user1_rank,
-            user2_value, user2_pnl, user2_volume, user2_rank,
-            expected_pnl, pnl_vs_expected, pnl_efficiency, scaling_ratio
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        data['timestamp'],
-        data['user1_value'], data['user1_pnl'], data['user1_volume'], data['user1_rank'],
-        data['user2_value'], data['user2_pnl'], data['user2_volume'], data['user2_rank'],
-        data['expected_pnl'], data['pnl_vs_expected'], data['pnl_efficiency'], data['scaling_ratio']
-    ))
-    conn.commit()
-    conn.close()
-
-
-def get_snapshots(hours: int = 24) -> List[Dict]:
-    """Get snapshots from the last N hours."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cutoff = (datetime.now() - timedelta(hours=hours)).isoformat()
-    rows = conn.execute("""
-        SELECT * FROM snapshots WHERE timestamp > ? ORDER BY timestamp ASC
-    """, (cutoff,)).fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    """Queue a snapshot, flushing the buffer to the database when it is due."""
+    global _SNAPSHOT_VERSION
+    with _DB_LOCK:
+        _PENDING.append({c: data[c] for c in SNAPSHOT_COLUMNS})
+        _SNAPSHOT_VERSION += 1
+        if len(_PENDING) >= FLUSH_ROWS or time.monotonic() - _LAST_FLUSH >= FLUSH_SECONDS:
+            _flush_pending_locked()
+
+
+def history_bucket_minutes(hours: int) -> int:
+    """Bucket width used to downsample a history range of `hours` (0 = none)."""
+    for max_hours, minutes in HISTORY_RESOLUTION:
+        if hours <= max_hours:
+            return minutes
+    return HISTORY_LONG_RANGE_MINUTES
+
+
+def pixel_bucket_minutes(hours: int, pixels: int) -> int:
+    """Widest SQL bucket that still leaves M4 at least 4 rows per pixel (0 = none)."""
+    for minutes in HISTORY_SQL_BUCKETS:
+        if hours * 60 // minutes >= 4 * pixels:
+            return minutes
+    return 0
+
+
+def downsample_snapshots(snapshots: Iterable[Dict], minutes: int) -> List[Dict]:
+    """Keep the latest snapshot in each `minutes`-wide bucket (input is time-ordered)."""
+    buckets: Dict[str, Dict] = {}
+    for snap in snapshots:
+        ts = snap['timestamp']  # ISO format: YYYY-MM-DDTHH:MM:...
+        buckets[ts[:14] + str(int(ts[14:16]) // minutes)] = snap
+    return list(buckets.values())
+
+
+def m4_downsample(snapshots: List[Dict], pixels: int, start: float, end: float) -> List[Dict]:
+    """
+    M4 aggregation: split [start, end] into `pixels` time buckets and keep, per
+    bucket, the first and last snapshot plus the min and max of every charted
+    series, so the drawn line looks the same as the raw data.
+    """
+    span = (end - start) / pixels or 1.0
+    series = HISTORY_COLUMNS[1:]
+    out: List[Dict] = []
+    group: List[Dict] = []
+    group_key = None
+
+    def flush():
+        keep = {0, len(group) - 1}
+        for col in series:
+            points = [(v, i) for i, snap in enumerate(group) if (v := snap[col]) is not None]
+            if points:
+                keep.add(min(points)[1])
+                keep.add(max(points)[1])
+        out.extend(group[i] for i in sorted(keep))
+
+    for snap in snapshots:
+        key = int((datetime.fromisoformat(snap['timestamp']).timestamp() - start) // span)
+        if key != group_key and group:
+            flush()
+            group = []
+        group_key = key
+        group.append(snap)
+    if group:
+        flush()
+    return out
+
+
+def get_snapshots(hours: int = 24, pixels: int = 0, since: Optional[str] = None) -> List[Dict]:
+    """
+    Get the charted columns of snapshots from the last N hours.
+    Long ranges are downsampled in SQL to the latest snapshot per bucket. With
+    `pixels`, buckets stay narrow enough to leave 4 rows per pixel and the result
+    is then M4-downsampled to that chart width.
+    With `since`, only the raw rows newer than that timestamp are returned.
+    """
+    now = datetime.now()
+    cutoff = max((now - timedelta(hours=hours)).isoformat(), since or '')
+    if since:
+        minutes = 0
+    elif pixels:
+        minutes = pixel_bucket_minutes(hours, pixels)
+    else:
+        minutes = history_bucket_minutes(hours)
+    with _DB_LOCK:
+        if minutes:
+            # SQLite takes bare columns from the row holding MAX(timestamp)
+            rows = get_conn().execute(f"""
+                SELECT MAX(timestamp) AS timestamp, {', '.join(HISTORY_COLUMNS[1:])} FROM snapshots
+                WHERE timestamp > ?
+                GROUP BY substr(timestamp, 1, 14) || (CAST(substr(timestamp, 15, 2) AS INTEGER) / ?)
+                ORDER BY timestamp ASC
+            """, (cutoff, minutes)).fetchall()
+        else:
+            rows = get_conn().execute(f"""
+                SELECT {', '.join(HISTORY_COLUMNS)} FROM snapshots
+                WHERE timestamp > ? ORDER BY timestamp ASC
+            """, (cutoff,)).fetchall()
+        pending = [{c: d[c] for c in HISTORY_COLUMNS} for d in _PENDING if d['timestamp'] > cutoff]
+    snapshots = [dict(row) for row in rows] + pending
+    if minutes and pending:
+        # Pending rows may fall into the newest bucket returned by SQL
+        snapshots = downsample_snapshots(snapshots, minutes)
+    if pixels and not since and len(snapshots) > 4 * pixels:
+        snapshots = m4_downsample(snapshots, pixels, now.timestamp() - hours * 3600, now.timestamp())
+    return snapshots
 
 
 def get_latest_snapshot() -> Optional[Dict]:
     """Get the most recent snapshot."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    row = conn.execute("""
-        SELECT * FROM snapshots ORDER BY timestamp DESC LIMIT 1
-    """).fetchone()
-    conn.close()
+    with _DB_LOCK:
+        if _PENDING:
+            return dict(_PENDING[-1])
+        row = get_conn().execute("""
+            SELECT * FROM snapshots ORDER BY timestamp DESC LIMIT 1
+        """).fetchone()
     return dict(row) if row else None
 
 
 # =============================================================================
 # DATA FETCHING
 # =============================================================================
-async def fetch_user_data(session: aiohttp.ClientSession, address: str) -> Dict:
-    """Fetch portfolio value and rolling 24-hour PNL for a user."""
-    result = {
-        'value': None,
-        'pnl': None,
-        'volume': None,
-        'rank': None,
-    }
+# One keep-alive HTTP session for the whole process (created lazily inside the loop)
+_SESSION: Optional[aiohttp.ClientSession] = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Return the shared HTTP session, creating it on first use."""
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=64,
+                limit_per_host=32,
+                ttl_dns_cache=300,
+                keepalive_timeout=75,
+                enable_cleanup_closed=True,
+            ),
+            timeout=aiohttp.ClientTimeout(total=30),
+            headers={"Accept-Encoding": "gzip"},
+        )
+    return _SESSION
 
-    # Fetch value
+
+async def close_session():
+    """Close the shared HTTP session."""
+    global _SESSION
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION = None
+
+
+async def _fetch_value(session: aiohttp.ClientSession, address: str) -> Optional[float]:
+    """Fetch portfolio value for a user."""
     try:
         async with session.get(
             f"{DATA_API_BASE}/value",
@@ -145,13 +411,16 @@ async def fetch_user_data(session: aiohttp.ClientSession, address: str) -> Dict:
             timeout=15
         ) as resp:
             if resp.status == 200:
-                data = await resp.json()
+                data = await resp.json(loads=json_loads)
                 if data and len(data) > 0:
-                    result['value'] = float(data[0].get("value", 0))
+                    return float(data[0].get("value", 0))
     except Exception as e:
         logger.error(f"Error fetching value for {address[:10]}: {e}")
+    return None
+
 
-    # Fetch rolling 24-hour PNL from user-pnl-api (matches frontend)
+async def _fetch_rolling_pnl(session: aiohttp.ClientSession, address: str) -> Optional[float]:
+    """Fetch rolling 24-hour PNL from user-pnl-api (matches frontend)."""
     try:
         async with session.get(
             USER_PNL_API,
@@ -163,107 +432,267 @@ async def fetch_user_data(session: aiohttp.ClientSession, address: str) -> Dict:
             timeout=15
         ) as resp:
             if resp.status == 200:
-                data = await resp.json()
+                data = await resp.json(loads=json_loads)
                 # Data is array of {"t": timestamp, "p": cumulative_pnl}
                 # Rolling 24h PNL = latest p - earliest p
                 if data and len(data) >= 2:
-                    sorted_data = sorted(data, key=lambda x: x.get("t", 0))
-                    earliest_pnl = float(sorted_data[0].get("p", 0))
-                    latest_pnl = float(sorted_data[-1].get("p", 0))
-                    result['pnl'] = latest_pnl - earliest_pnl
+                    # Single scan; ties resolve like a stable sort (first earliest, last latest)
+                    earliest = latest = data[0]
+                    earliest_t = latest_t = earliest.get("t", 0)
+                    for point in data[1:]:
+                        t = point.get("t", 0)
+                        if t < earliest_t:
+                            earliest, earliest_t = point, t
+                        if t >= latest_t:
+                            latest, latest_t = point, t
+                    return float(latest.get("p", 0)) - float(earliest.get("p", 0))
                 elif data and len(data) == 1:
-                    result['pnl'] = 0.0
+                    return 0.0
     except Exception as e:
         logger.error(f"Error fetching rolling PNL for {address[:10]}: {e}")
+    return None
 
-    return result
+
+async def fetch_user_data(session: aiohttp.ClientSession, address: str) -> Dict:
+    """Fetch portfolio value and rolling 24-hour PNL for a user."""
+    # Both requests are independent, so issue them concurrently
+    value, pnl = await asyncio.gather(
+        _fetch_value(session, address),
+        _fetch_rolling_pnl(session, address),
+    )
+    return {
+        'value': value,
+        'pnl': pnl,
+        'volume': None,
+        'rank': None,
+    }
+
+
+async def _fetch_positions_page(session: aiohttp.ClientSession, address: str,
+                                offset: int, limit: int) -> Optional[List[Dict]]:
+    """Fetch one page of positions; None on error."""
+    try:
+        async with session.get(
+            f"{DATA_API_BASE}/positions",
+            params={
+                "user": address,
+                "sizeThreshold": "0.1",
+                "limit": limit,
+                "offset": offset,
+            },
+            timeout=30
+        ) as resp:
+            if resp.status != 200:
+                return None
+            return await resp.json(loads=json_loads)
+    except Exception as e:
+        logger.error(f"Error fetching positions for {address[:10]} at offset {offset}: {e}")
+        return None
 
 
 async def fetch_all_positions(session: aiohttp.ClientSession, address: str) -> List[Dict]:
-    """Fetch ALL positions for a user (paginated)."""
-    all_positions = []
-    offset = 0
+    """
+    Fetch ALL positions for a user (paginated).
+
+    Probes the first page, then fetches the following pages concurrently in
+    batches that double in size until a short/empty page marks the end.
+    """
     limit = 100
+    first = await _fetch_positions_page(session, address, 0, limit)
+    if not first:
+        return []
+    all_positions = list(first)
+    if len(first) < limit:
+        return all_positions
 
+    sem = asyncio.Semaphore(POSITIONS_PAGE_CONCURRENCY)
+
+    async def bounded_fetch(offset):
+        async with sem:
+            return await _fetch_positions_page(session, address, offset, limit)
+
+    offset = limit
+    batch = 2
     while True:
-        try:
-            async with session.get(
-                f"{DATA_API_BASE}/positions",
-                params={
-                    "user": address,
-                    "sizeThreshold": "0.1",
-                    "limit": limit,
-                    "offset": offset,
-                },
-                timeout=30
-            ) as resp:
-                if resp.status != 200:
-                    break
-                data = await resp.json()
-                if not data:
-                    break
-                all_positions.extend(data)
-                if len(data) < limit:
-                    break
-                offset += limit
-        except Exception as e:
-            logger.error(f"Error fetching positions for {address[:10]} at offset {offset}: {e}")
-            break
+        pages = await asyncio.gather(*(bounded_fetch(offset + i * limit) for i in range(batch)))
+        for page in pages:
+            if not page:
+                return all_positions  # error or empty page: stop here, keep order
+            all_positions.extend(page)
+            if len(page) < limit:
+                return all_positions
+        offset += batch * limit
+        batch = min(batch * 2, POSITIONS_PAGE_CONCURRENCY * 2)
+
+
+# Canonical UTC timestamps ("2024-12-20T00:00:00Z") order correctly as plain strings
+_CANONICAL_UTC = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z')
+
+
+def utc_now_iso() -> str:
+    """Current UTC time in the canonical format accepted by is_market_active."""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
 
-    return all_positions
 
+@functools.lru_cache(maxsize=4096)
+def _parse_end_date(end_date_str: str) -> datetime:
+    return datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
 
-def is_market_active(end_date_str: Optional[str]) -> bool:
+
+def is_market_active(end_date_str: Optional[str], now_iso: Optional[str] = None) -> bool:
     """Check if a market is still active (end date hasn't passed)."""
     if not end_date_str:
         return True  # No end date means assume active
+    if _CANONICAL_UTC.fullmatch(end_date_str):
+        return end_date_str > (now_iso or utc_now_iso())
     try:
-        # Parse ISO format date (e.g., "2024-12-20T00:00:00Z")
-        end_date_str = end_date_str.replace('Z', '+00:00')
-        end_date = datetime.fromisoformat(end_date_str)
+        # Parse ISO format date (e.g., "2024-12-20T00:00:00.000Z")
+        end_date = _parse_end_date(end_date_str)
         now = datetime.now(end_date.tzinfo) if end_date.tzinfo else datetime.now()
         return end_date > now
     except (ValueError, TypeError):
         return True  # If we can't parse, assume active
 
 
+def _num(pos: Dict, key: str) -> float:
+    return float(pos.get(key, 0) or 0)
+
+
+@dataclass(slots=True)
+class PositionFields:
+    """Numeric fields of an API position, converted to float once."""
+    size: float
+    avg_price: float
+    cur_price: float
+    current_value: float
+    cash_pnl: float
+
+    @classmethod
+    def from_api(cls, pos: Dict) -> 'PositionFields':
+        return cls(_num(pos, 'size'), _num(pos, 'avgPrice'), _num(pos, 'curPrice'),
+                   _num(pos, 'currentValue'), _num(pos, 'cashPnl'))
+
+
+# Dashboard sort columns, and the tie-breaker column used under each
+POSITION_SORT_COLUMNS = {
+    'whale_size': lambda c: c['whale']['size'],
+    'deviation': lambda c: c['fill_rate_deviation'],
+    'pnl_impact': lambda c: c['deviation_pnl_impact'],
+}
+POSITION_SORT_SECONDARY = {'whale_size': 'deviation', 'deviation': 'whale_size', 'pnl_impact': 'whale_size'}
+
+
+def position_sort_orders(comparisons: List[Dict]) -> Dict[str, Dict]:
+    """
+    Index orders of `comparisons` for every dashboard sort state, as
+    orders[primary][primary_dir][secondary_dir] with dirs 'asc'/'desc'.
+    Stable, so ties keep their original order like the client-side sort did.
+    """
+    values = {name: [key(c) for c in comparisons] for name, key in POSITION_SORT_COLUMNS.items()}
+    indices = range(len(comparisons))
+    orders = {}
+    for primary, secondary in POSITION_SORT_SECONDARY.items():
+        pv, sv = values[primary], values[secondary]
+        orders[primary] = {
+            pdir: {
+                sdir: sorted(indices, key=lambda i: (pv[i] if pdir == 'asc' else -pv[i],
+                                                     sv[i] if sdir == 'asc' else -sv[i]))
+                for sdir in ('asc', 'desc')
+            }
+            for pdir in ('asc', 'desc')
+        }
+    return orders
+
+
+def size_bucket_totals(comparisons: List[Dict], size_buckets: List[float]) -> Dict[str, list]:
+    """
+    Per-bucket counts and sums for the size-bucket analytics.
+    Bucket i holds whale sizes below size_buckets[i] (the last bucket catches the rest).
+    """
+    n = len(size_buckets)
+    if np is not None and comparisons:
+        count = len(comparisons)
+        sizes = np.fromiter((c['whale']['size'] for c in comparisons), dtype=np.float64, count=count)
+        w_pnl = np.fromiter((c['whale']['cashPnl'] for c in comparisons), dtype=np.float64, count=count)
+        c_pnl = np.fromiter((c['copier']['cashPnl'] if c['copier'] else 0.0 for c in comparisons),
+                            dtype=np.float64, count=count)
+        actual = np.fromiter((c['actual_size'] for c in comparisons), dtype=np.float64, count=count)
+        idx = np.digitize(sizes, np.array(size_buckets[:-1]))
+
+        def per_bucket(weights=None):
+            return np.bincount(idx, weights=weights, minlength=n).tolist()
+
+        return {
+            'count': per_bucket(),
+            'whale_pnl': per_bucket(w_pnl),
+            'copier_pnl': per_bucket(c_pnl),
+            'whale_size': per_bucket(sizes),
+            'copier_size': per_bucket(actual),
+            'whale_winners': [int(v) for v in per_bucket((w_pnl > 0).astype(np.float64))],
+            'whale_losers': [int(v) for v in per_bucket((w_pnl < 0).astype(np.float64))],
+        }
+
+    totals = {key: [0] * n for key in ('count', 'whale_pnl', 'copier_pnl', 'whale_size',
+                                        'copier_size', 'whale_winners', 'whale_losers')}
+    bounds = size_buckets[:-1]
+    for c in comparisons:
+        size = c['whale']['size']
+        pnl = c['whale']['cashPnl']
+        i = bisect.bisect_right(bounds, size) if size == size else n - 1  # NaN -> last bucket
+        totals['count'][i] += 1
+        totals['whale_pnl'][i] += pnl
+        if c['copier']:
+            totals['copier_pnl'][i] += c['copier']['cashPnl']
+        totals['whale_size'][i] += size
+        totals['copier_size'][i] += c['actual_size']
+        totals['whale_winners'][i] += pnl > 0
+        totals['whale_losers'][i] += pnl < 0
+    return totals
+
+
 async def compare_positions() -> Dict:
     """
     Compare positions between whale and copier.
     Returns positions ranked by fill rate deviation from expected.
     Only includes active markets (end date hasn't passed).
     """
-    async with aiohttp.ClientSession() as session:
-        # Fetch positions for both users in parallel
-        whale_positions, copier_positions = await asyncio.gather(
-            fetch_all_positions(session, USER_2_ADDRESS),
-            fetch_all_positions(session, USER_1_ADDRESS)
-        )
+    session = get_session()
+    # Fetch positions for both users in parallel
+    whale_positions, copier_positions = await asyncio.gather(
+        fetch_all_positions(session, USER_2_ADDRESS),
+        fetch_all_positions(session, USER_1_ADDRESS)
+    )
 
-    # Index copier positions by asset (token ID)
-    copier_by_asset = {p['asset']: p for p in copier_positions}
+    # Convert each copier position's numeric fields once and index by asset (token ID)
+    copier_rows = [(p, PositionFields.from_api(p)) for p in copier_positions]
+    copier_by_asset = {row[0]['asset']: row for row in copier_rows}
 
     # Compare each whale position to copier's (only active markets)
     comparisons = []
+    whale_assets = set()
+    now_iso = utc_now_iso()
 
     for whale_pos in whale_positions:
         asset = whale_pos.get('asset')
         if not asset:
             continue
+        whale_assets.add(asset)
 
         # Skip closed/ended markets
-        if not is_market_active(whale_pos.get('endDate')):
+        if not is_market_active(whale_pos.get('endDate'), now_iso):
             continue
 
-        whale_size = float(whale_pos.get('size', 0) or 0)
+        whale = PositionFields.from_api(whale_pos)
+        whale_size = whale.size
         if whale_size <= 0:
             continue
 
         expected_size = whale_size * SCALING_RATIO
-        copier_pos = copier_by_asset.get(asset)
+        copier_row = copier_by_asset.get(asset)
 
-        if copier_pos:
-            actual_size = float(copier_pos.get('size', 0) or 0)
+        if copier_row:
+            copier = copier_row[1]
+            actual_size = copier.size
             fill_rate = actual_size / whale_size if whale_size > 0 else 0
             expected_fill_rate = SCALING_RATIO
             fill_rate_deviation = fill_rate - expected_fill_rate
@@ -271,16 +700,14 @@ async def compare_positions() -> Dict:
             size_deviation_pct = (size_deviation / expected_size * 100) if expected_size > 0 else 0
 
             # Calculate PNL impact of deviation
-            cur_price = float(whale_pos.get('curPrice', 0) or 0)
-            avg_price = float(copier_pos.get('avgPrice', 0) or 0)
-            pnl_per_share = cur_price - avg_price if avg_price > 0 else 0
+            pnl_per_share = whale.cur_price - copier.avg_price if copier.avg_price > 0 else 0
             deviation_pnl_impact = size_deviation * pnl_per_share
 
             copier_data = {
                 'size': actual_size,
-                'avgPrice': float(copier_pos.get('avgPrice', 0) or 0),
-                'currentValue': float(copier_pos.get('currentValue', 0) or 0),
-                'cashPnl': float(copier_pos.get('cashPnl', 0) or 0),
+                'avgPrice': copier.avg_price,
+                'currentValue': copier.current_value,
+                'cashPnl': copier.cash_pnl,
             }
         else:
             # Copier doesn't have this position
@@ -301,10 +728,10 @@ async def compare_positions() -> Dict:
             'endDate': whale_pos.get('endDate'),
             'whale': {
                 'size': whale_size,
-                'avgPrice': float(whale_pos.get('avgPrice', 0) or 0),
-                'curPrice': float(whale_pos.get('curPrice', 0) or 0),
-                'currentValue': float(whale_pos.get('currentValue', 0) or 0),
-                'cashPnl': float(whale_pos.get('cashPnl', 0) or 0),
+                'avgPrice': whale.avg_price,
+                'curPrice': whale.cur_price,
+                'currentValue': whale.current_value,
+                'cashPnl': whale.cash_pnl,
             },
             'copier': copier_data,
             'expected_size': expected_size,
@@ -315,13 +742,12 @@ async def compare_positions() -> Dict:
             'size_deviation': size_deviation,
             'size_deviation_pct': size_deviation_pct,
             'deviation_pnl_impact': deviation_pnl_impact,
-            'has_position': copier_pos is not None,
+            'has_position': copier_row is not None,
         })
 
     # Also find positions copier has that whale doesn't (shouldn't happen in pure copy)
-    whale_assets = {p['asset'] for p in whale_positions if p.get('asset')}
     extra_positions = []
-    for copier_pos in copier_positions:
+    for copier_pos, copier in copier_rows:
         asset = copier_pos.get('asset')
         if asset and asset not in whale_assets:
             extra_positions.append({
@@ -330,9 +756,9 @@ async def compare_positions() -> Dict:
                 'slug': copier_pos.get('slug', ''),
                 'outcome': copier_pos.get('outcome', ''),
                 'icon': copier_pos.get('icon', ''),
-                'size': float(copier_pos.get('size', 0) or 0),
-                'currentValue': float(copier_pos.get('currentValue', 0) or 0),
-                'cashPnl': float(copier_pos.get('cashPnl', 0) or 0),
+                'size': copier.size,
+                'currentValue': copier.current_value,
+                'cashPnl': copier.cash_pnl,
             })
 
     # Sort by: 1) Whale size (descending), 2) Fill rate deviation (ascending, so most negative first)
@@ -340,17 +766,27 @@ async def compare_positions() -> Dict:
 
     # Calculate summary stats
     total_whale_positions = len(whale_positions)
-    matched_positions = sum(1 for c in comparisons if c['has_position'])
+    # Categorize and accumulate totals in a single pass
+    overfilled, underfilled, missed, on_target = [], [], [], []
+    total_fill_rate = 0.0
+    total_deviation_pnl = 0.0
+    for c in comparisons:
+        total_fill_rate += c['fill_rate']
+        total_deviation_pnl += c['deviation_pnl_impact']
+        deviation = c['fill_rate_deviation']
+        if deviation > 0.01:  # >1% over
+            overfilled.append(c)
+        elif deviation < -0.01:
+            if c['has_position']:
+                underfilled.append(c)
+        elif abs(deviation) <= 0.01:
+            on_target.append(c)
+        if not c['has_position']:
+            missed.append(c)
+
+    matched_positions = len(comparisons) - len(missed)
     missed_positions = total_whale_positions - matched_positions
-
-    avg_fill_rate = sum(c['fill_rate'] for c in comparisons) / len(comparisons) if comparisons else 0
-    total_deviation_pnl = sum(c['deviation_pnl_impact'] for c in comparisons)
-
-    # Categorize
-    overfilled = [c for c in comparisons if c['fill_rate_deviation'] > 0.01]  # >1% over
-    underfilled = [c for c in comparisons if c['fill_rate_deviation'] < -0.01 and c['has_position']]
-    missed = [c for c in comparisons if not c['has_position']]
-    on_target = [c for c in comparisons if abs(c['fill_rate_deviation']) <= 0.01]
+    avg_fill_rate = total_fill_rate / len(comparisons) if comparisons else 0
 
     # =========================================================================
     # NEW ANALYTICS: PNL breakdown by fill status
@@ -381,57 +817,34 @@ async def compare_positions() -> Dict:
     size_buckets = [500, 1000, 1500, 2000, 2500, 3000, 4000, 5000, 10000, float('inf')]
     bucket_labels = ['0-500', '500-1k', '1k-1.5k', '1.5k-2k', '2k-2.5k', '2.5k-3k', '3k-4k', '4k-5k', '5k-10k', '10k+']
 
-    def get_bucket_idx(size):
-        for i, threshold in enumerate(size_buckets):
-            if size < threshold:
-                return i
-        return len(size_buckets) - 1
-
-    # Initialize bucket stats
-    bucket_stats = []
-    for i, label in enumerate(bucket_labels):
-        bucket_stats.append({
-            'label': label,
-            'min_size': 0 if i == 0 else size_buckets[i-1],
-            'max_size': size_buckets[i],
-            'positions': [],
-        })
-
-    # Assign positions to buckets
-    for c in comparisons:
-        idx = get_bucket_idx(c['whale']['size'])
-        bucket_stats[idx]['positions'].append(c)
+    totals = size_bucket_totals(comparisons, size_buckets)
 
     # Calculate stats per bucket
     size_bucket_analysis = []
-    for bucket in bucket_stats:
-        positions = bucket['positions']
-        if not positions:
+    for i, label in enumerate(bucket_labels):
+        count = totals['count'][i]
+        if not count:
             continue
 
-        whale_pnl = sum(p['whale']['cashPnl'] for p in positions)
-        copier_pnl = sum(p['copier']['cashPnl'] for p in positions if p['copier'])
-        total_whale_size = sum(p['whale']['size'] for p in positions)
-        total_copier_size = sum(p['actual_size'] for p in positions)
+        whale_pnl = totals['whale_pnl'][i]
+        total_whale_size = totals['whale_size'][i]
+        total_copier_size = totals['copier_size'][i]
         avg_fill_rate = total_copier_size / total_whale_size if total_whale_size > 0 else 0
-
-        # Count winners/losers for whale
-        whale_winners = sum(1 for p in positions if p['whale']['cashPnl'] > 0)
-        whale_losers = sum(1 for p in positions if p['whale']['cashPnl'] < 0)
+        whale_winners = totals['whale_winners'][i]
 
         size_bucket_analysis.append({
-            'label': bucket['label'],
-            'count': len(positions),
+            'label': label,
+            'count': count,
             'whale_pnl': whale_pnl,
-            'copier_pnl': copier_pnl,
-            'avg_whale_pnl': whale_pnl / len(positions),
+            'copier_pnl': totals['copier_pnl'][i],
+            'avg_whale_pnl': whale_pnl / count,
             'total_whale_size': total_whale_size,
             'total_copier_size': total_copier_size,
             'avg_fill_rate': avg_fill_rate,
             'fill_rate_vs_target': (avg_fill_rate / SCALING_RATIO * 100) if SCALING_RATIO > 0 else 0,
             'whale_winners': whale_winners,
-            'whale_losers': whale_losers,
-            'whale_win_rate': whale_winners / len(positions) * 100 if positions else 0,
+            'whale_losers': totals['whale_losers'][i],
+            'whale_win_rate': whale_winners / count * 100,
         })
 
     return {
@@ -459,16 +872,17 @@ async def compare_positions() -> Dict:
         # New analytics
         'pnl_by_fill_status': pnl_by_fill_status,
         'size_bucket_analysis': size_bucket_analysis,
+        'sort_orders': position_sort_orders(comparisons),
     }
 
 
 async def fetch_and_store():
     """Fetch data for both users and store in database."""
-    async with aiohttp.ClientSession() as session:
-        user1_data, user2_data = await asyncio.gather(
-            fetch_user_data(session, USER_1_ADDRESS),
-            fetch_user_data(session, USER_2_ADDRESS)
-        )
+    session = get_session()
+    user1_data, user2_data = await asyncio.gather(
+        fetch_user_data(session, USER_1_ADDRESS),
+        fetch_user_data(session, USER_2_ADDRESS)
+    )
 
     now = datetime.now().isoformat()
 
@@ -503,7 +917,7 @@ async def fetch_and_store():
         'scaling_ratio': SCALING_RATIO,
     }
 
-    save_snapshot(snapshot)
+    await asyncio.to_thread(save_snapshot, snapshot)
 
     # Log summary
     if pnl_vs_expected is not None:
@@ -520,6 +934,49 @@ async def fetch_and_store():
     return snapshot
 
 
+# =============================================================================
+# POSITIONS CACHE
+# =============================================================================
+# Last compare_positions() result as an encoded response body. 'ts' is a
+# monotonic timestamp; 0 means stale (e.g. loaded from disk at startup).
+_POSITIONS: Dict[str, Any] = {'ts': 0.0, 'body': None, 'requested': float('-inf')}
+_POSITIONS_LOCK = asyncio.Lock()
+
+
+def load_positions_cache():
+    """Seed the positions cache from the last result persisted to disk."""
+    try:
+        _POSITIONS['body'] = POSITIONS_CACHE_PATH.read_bytes()
+    except FileNotFoundError:
+        pass
+
+
+def _persist_positions(body: bytes):
+    tmp = POSITIONS_CACHE_PATH.with_name(POSITIONS_CACHE_PATH.name + '.tmp')
+    tmp.write_bytes(body)
+    os.replace(tmp, POSITIONS_CACHE_PATH)
+
+
+def positions_fresh() -> bool:
+    # The background loop refreshes every FETCH_INTERVAL plus the time the comparison
+    # itself takes; the slack keeps polls in that gap from starting a second one
+    return _POSITIONS['body'] is not None and time.monotonic() - _POSITIONS['ts'] < 2 * FETCH_INTERVAL
+
+
+async def refresh_positions(force: bool = False) -> bytes:
+    """
+    Recompute the position comparison unless a fresh result exists.
+    Concurrent callers share a single upstream fetch.
+    """
+    async with _POSITIONS_LOCK:
+        if force or not positions_fresh():
+            body = json_dumps_bytes(await compare_positions())
+            _POSITIONS['ts'] = time.monotonic()
+            _POSITIONS['body'] = body
+            await asyncio.to_thread(_persist_positions, body)
+        return _POSITIONS['body']
+
+
 # =============================================================================
 # BACKGROUND TASK
 # =============================================================================
@@ -531,38 +988,156 @@ async def background_fetcher():
             await fetch_and_store()
         except Exception as e:
             logger.error(f"Error in background fetch: {e}")
+        if time.monotonic() - _POSITIONS['requested'] < POSITIONS_ACTIVE_SECONDS:
+            # Only keep positions warm while a dashboard is polling them
+            try:
+                await refresh_positions(force=True)
+            except Exception as e:
+                logger.error(f"Error comparing positions: {e}")
         await asyncio.sleep(FETCH_INTERVAL)
 
 
 # =============================================================================
 # WEB SERVER
 # =============================================================================
+def pick_encoding(request, variants) -> Optional[str]:
+    """Best precompressed variant the client accepts (None = identity)."""
+    accepted = set()
+    for token in request.headers.get('Accept-Encoding', '').split(','):
+        coding, *params = token.split(';')
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:  # q=0 means "not acceptable"
+            accepted.add(coding.strip().lower())
+    return next((e for e in ('br', 'gzip') if e in variants and e in accepted), None)
+
+
 async def handle_index(request):
-    """Serve the main dashboard page."""
-    return web.Response(text=HTML_TEMPLATE, content_type='text/html')
+    """Serve the main dashboard page, flushing <head> first so CDN scripts start early."""
+    encoding = pick_encoding(request, INDEX_VARIANTS)
+    headers = {'ETag': INDEX_ETAGS[encoding], 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    if request.headers.get('If-None-Match') == INDEX_ETAGS[encoding]:
+        return web.Response(status=304, headers=headers)
 
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    head, body = INDEX_VARIANTS[encoding]
 
-async def handle_api_latest(request):
-    """API endpoint for latest snapshot."""
-    snapshot = get_latest_snapshot()
-    return web.json_response(snapshot or {})
+    resp = web.StreamResponse(headers={'Content-Type': 'text/html; charset=utf-8', **headers})
+    resp.enable_chunked_encoding()
+    await resp.prepare(request)
+    await resp.write(head)
+    await resp.write(body)
+    await resp.write_eof()
+    return resp
 
 
-async def handle_api_history(request):
-    """API endpoint for historical data."""
-    hours = int(request.query.get('hours', 24))
-    snapshots = get_snapshots(hours=hours)
-    return web.json_response({
-        'snapshots': snapshots,
+def _json_response(obj, status: int = 200) -> web.Response:
+    return web.Response(body=json_dumps_bytes(obj), status=status, content_type='application/json')
+
+
+async def handle_static_asset(request):
+    """Serve a dashboard stylesheet/script (its URL changes whenever its content does)."""
+    content_type, variants = STATIC_ASSETS[request.path]
+    headers = {'Cache-Control': 'public, max-age=31536000, immutable', 'Vary': 'Accept-Encoding'}
+    encoding = pick_encoding(request, variants)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return web.Response(body=variants[encoding], content_type=content_type, headers=headers)
+
+
+# Browsers may reuse snapshot responses briefly; new data lands every FETCH_INTERVAL
+SNAPSHOT_CACHE_HEADERS = {'Cache-Control': f'public, max-age={FETCH_INTERVAL // 4}'}
+
+# (snapshot version, snapshot timestamp, encoded body) of the last /api/latest response
+_LATEST_CACHE: Optional[tuple] = None
+
+
+async def handle_api_latest(request):
+    """API endpoint for latest snapshot.
+
+    With `?since=<timestamp>` (the newest snapshot the client already has) the
+    reply is 204 No Content until a newer snapshot lands.
+    """
+    global _LATEST_CACHE
+    if _LATEST_CACHE is None or _LATEST_CACHE[0] != _SNAPSHOT_VERSION:
+        version = _SNAPSHOT_VERSION
+        snapshot = await asyncio.to_thread(get_latest_snapshot)
+        _LATEST_CACHE = (version, (snapshot or {}).get('timestamp'), json_dumps_bytes(snapshot or {}))
+    _, latest_ts, body = _LATEST_CACHE
+    since = request.query.get('since')
+    if since and (latest_ts is None or latest_ts <= since):
+        return web.Response(status=204, headers=SNAPSHOT_CACHE_HEADERS)
+    return web.Response(body=body, content_type='application/json', headers=SNAPSHOT_CACHE_HEADERS)
+
+
+def build_history_body(hours: int, pixels: int = 0, since: Optional[str] = None) -> bytes:
+    """Encoded /api/history response for the last `hours` hours."""
+    return json_dumps_bytes({
+        'snapshots': get_snapshots(hours, pixels, since),
         'scaling_ratio': SCALING_RATIO,
         'user1_label': USER_1_LABEL,
         'user2_label': USER_2_LABEL,
     })
 
 
+# (hours, pixels) -> (snapshot version, monotonic time built, encoded body), oldest first
+_HISTORY_CACHE: Dict[tuple, tuple] = {}
+
+
+def history_pixels(query) -> int:
+    """Chart width in device pixels from the `width`/`dpr` query params (0 = not sent)."""
+    if 'width' not in query:
+        return 0
+    pixels = float(query['width']) * float(query.get('dpr', 1))
+    if pixels != pixels:  # NaN
+        raise ValueError("width is not a number")
+    pixels = max(HISTORY_MIN_PIXELS, min(pixels, HISTORY_MAX_PIXELS))
+    return -(-int(pixels) // HISTORY_PIXEL_STEP) * HISTORY_PIXEL_STEP
+
+
+async def handle_api_history(request):
+    """API endpoint for historical data."""
+    try:
+        hours = int(request.query.get('hours', 24))
+        pixels = history_pixels(request.query)
+        since = request.query.get('since')
+        if since is not None:
+            datetime.fromisoformat(since)
+    except ValueError:
+        raise web.HTTPBadRequest(text="hours must be an integer, width/dpr numbers and since an ISO timestamp")
+    hours = max(1, min(hours, MAX_HISTORY_HOURS))
+    if since is not None:
+        # Incremental refresh: only the few rows after the client's last point, never cached
+        body = await asyncio.to_thread(build_history_body, hours, 0, since)
+        return web.Response(body=body, content_type='application/json')
+    key = (hours, pixels)
+    cached = _HISTORY_CACHE.get(key)
+    if (cached is None or cached[0] != _SNAPSHOT_VERSION
+            or time.monotonic() - cached[1] >= HISTORY_CACHE_TTL):
+        version = _SNAPSHOT_VERSION
+        body = await asyncio.to_thread(build_history_body, hours, pixels)
+        cached = (version, time.monotonic(), body)
+        # Entries built from older snapshots can never be served again; beyond
+        # that, evict the oldest so varying the query string cannot grow the cache
+        for stale in [k for k, v in _HISTORY_CACHE.items() if v[0] != version]:
+            del _HISTORY_CACHE[stale]
+        _HISTORY_CACHE.pop(key, None)
+        _HISTORY_CACHE[key] = cached
+        while len(_HISTORY_CACHE) > HISTORY_CACHE_SIZE:
+            del _HISTORY_CACHE[next(iter(_HISTORY_CACHE))]
+    return web.Response(body=cached[2], content_type='application/json', headers=SNAPSHOT_CACHE_HEADERS)
+
+
 async def handle_api_config(request):
     """API endpoint for configuration."""
-    return web.json_response({
+    return _json_response({
         'scaling_ratio': SCALING_RATIO,
         'user1_address': USER_1_ADDRESS,
         'user2_address': USER_2_ADDRESS,
@@ -574,193 +1149,1309 @@ async def handle_api_config(request):
 
 async def handle_api_positions(request):
     """API endpoint for position comparison."""
+    _POSITIONS['requested'] = time.monotonic()
+    # While a refresh is running, serve the previous result instead of waiting on it
+    if positions_fresh() or (_POSITIONS['body'] is not None and _POSITIONS_LOCK.locked()):
+        return web.Response(body=_POSITIONS['body'], content_type='application/json')
     try:
-        data = await compare_positions()
-        return web.json_response(data)
+        body = await refresh_positions()
+        return web.Response(body=body, content_type='application/json')
     except Exception as e:
         logger.error(f"Error comparing positions: {e}")
-        return web.json_response({'error': str(e)}, status=500)
+        return _json_response({'error': str(e)}, status=500)
 
 
 # =============================================================================
 # HTML TEMPLATE
 # =============================================================================
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>PNL Divergence Monitor</title>
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <script src="https://cdn.jsdelivr.net/npm/chartjs-adapter-date-fns"></script>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif;
-            background: #0f0f0f;
-            color: #e0e0e0;
-            min-height: 100vh;
-            padding: 20px;
-        }
-        .header {
-            text-align: center;
-            margin-bottom: 30px;
-        }
-        .header h1 {
-            font-size: 28px;
-            color: #fff;
-            margin-bottom: 5px;
-        }
-        .header .subtitle {
-            color: #888;
-            font-size: 14px;
-        }
-        .header .scaling {
-            color: #4ade80;
-            font-weight: bold;
-        }
-        .grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
-            gap: 20px;
-            margin-bottom: 30px;
-        }
-        .card {
-            background: #1a1a1a;
-            border-radius: 12px;
-            padding: 20px;
-            border: 1px solid #2a2a2a;
-        }
-        .card h3 {
-            color: #888;
-            font-size: 12px;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-            margin-bottom: 10px;
-        }
-        .card .value {
-            font-size: 32px;
-            font-weight: bold;
-            color: #fff;
-        }
-        .card .value.positive { color: #4ade80; }
-        .card .value.negative { color: #f87171; }
-        .card .subtext {
-            color: #666;
-            font-size: 12px;
-            margin-top: 5px;
-        }
-        .comparison {
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 20px;
-            margin-bottom: 30px;
+# Served from a content-hashed URL with an immutable cache header, so browsers
+# only refetch it when the stylesheet actually changes
+DASHBOARD_CSS = """
+* {
+    margin: 0;
+    padding: 0;
+    box-sizing: border-box;
+}
+body {
+    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif;
+    background: #0f0f0f;
+    color: #e0e0e0;
+    min-height: 100vh;
+    padding: 20px;
+}
+.header {
+    text-align: center;
+    margin-bottom: 30px;
+}
+.header h1 {
+    font-size: 28px;
+    color: #fff;
+    margin-bottom: 5px;
+}
+.header .subtitle {
+    color: #888;
+    font-size: 14px;
+}
+.header .scaling {
+    color: #4ade80;
+    font-weight: bold;
+}
+.grid {
+    display: grid;
+    grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
+    gap: 20px;
+    margin-bottom: 30px;
+}
+.card {
+    background: #1a1a1a;
+    border-radius: 12px;
+    padding: 20px;
+    border: 1px solid #2a2a2a;
+}
+.card h3 {
+    color: #888;
+    font-size: 12px;
+    text-transform: uppercase;
+    letter-spacing: 1px;
+    margin-bottom: 10px;
+}
+.card .value {
+    font-size: 32px;
+    font-weight: bold;
+    color: #fff;
+}
+.card .value.positive { color: #4ade80; }
+.card .value.negative { color: #f87171; }
+.card .subtext {
+    color: #666;
+    font-size: 12px;
+    margin-top: 5px;
+}
+.comparison {
+    display: grid;
+    grid-template-columns: 1fr 1fr;
+    gap: 20px;
+    margin-bottom: 30px;
+}
+.user-card {
+    background: #1a1a1a;
+    border-radius: 12px;
+    padding: 20px;
+    border: 1px solid #2a2a2a;
+}
+.user-card h2 {
+    font-size: 18px;
+    margin-bottom: 15px;
+    display: flex;
+    align-items: center;
+    gap: 10px;
+}
+.user-card.user1 h2 { color: #60a5fa; }
+.user-card.user2 h2 { color: #fbbf24; }
+.metric {
+    display: flex;
+    justify-content: space-between;
+    padding: 8px 0;
+    border-bottom: 1px solid #2a2a2a;
+}
+.metric:last-child { border-bottom: none; }
+.metric .label { color: #888; }
+.metric .val { font-weight: 600; }
+.chart-container {
+    background: #1a1a1a;
+    border-radius: 12px;
+    padding: 20px;
+    border: 1px solid #2a2a2a;
+    margin-bottom: 20px;
+}
+.chart-container h3 {
+    color: #fff;
+    margin-bottom: 15px;
+    font-size: 16px;
+}
+.chart-wrapper {
+    height: 300px;
+}
+.status-bar {
+    position: fixed;
+    bottom: 0;
+    left: 0;
+    right: 0;
+    background: #1a1a1a;
+    border-top: 1px solid #2a2a2a;
+    padding: 10px 20px;
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+    font-size: 12px;
+}
+.status-bar .dot {
+    width: 8px;
+    height: 8px;
+    border-radius: 50%;
+    background: #4ade80;
+    display: inline-block;
+    margin-right: 8px;
+    animation: pulse 2s infinite;
+}
+@keyframes pulse {
+    0%, 100% { opacity: 1; }
+    50% { opacity: 0.5; }
+}
+.time-selector {
+    display: flex;
+    gap: 10px;
+    margin-bottom: 20px;
+    justify-content: center;
+}
+.time-selector button {
+    background: #2a2a2a;
+    border: none;
+    color: #888;
+    padding: 8px 16px;
+    border-radius: 6px;
+    cursor: pointer;
+    transition: all 0.2s;
+}
+.time-selector button:hover {
+    background: #3a3a3a;
+    color: #fff;
+}
+.time-selector button.active {
+    background: #4ade80;
+    color: #000;
+}
+.efficiency-bar {
+    height: 20px;
+    background: #2a2a2a;
+    border-radius: 10px;
+    overflow: hidden;
+    margin-top: 10px;
+}
+.efficiency-fill {
+    height: 100%;
+    transition: width 0.3s;
+}
+/* Positions table rows (generated as one HTML string per render) */
+.pos-row { border-bottom: 1px solid #2a2a2a; height: 56px; }
+.pos-row td { text-align: right; padding: 10px; }
+.pos-row td.pos-market {
+    text-align: left;
+    max-width: 300px;
+    white-space: nowrap;
+    overflow: hidden;
+    text-overflow: ellipsis;
+}
+.pos-market a { color: #60a5fa; text-decoration: none; }
+.pos-outcome { color: #666; font-size: 11px; }
+.pos-row .dev-over { color: #60a5fa; }
+.pos-row .dev-under { color: #fbbf24; }
+.pos-row .dev-missed, .pos-row .pnl-neg { color: #f87171; }
+.pos-row .dev-ok, .pos-row .pnl-pos { color: #4ade80; }
+th.sortable { text-align: right; padding: 10px; color: #888; cursor: pointer; user-select: none; }
+th.sortable.active-sort { color: #4ade80; }
+"""
+DASHBOARD_CSS_BYTES = DASHBOARD_CSS.encode()
+DASHBOARD_CSS_URL = f"/static/dashboard.{hashlib.blake2b(DASHBOARD_CSS_BYTES, digest_size=6).hexdigest()}.css"
+
+# The dashboard script, served the same way as the stylesheet
+DASHBOARD_JS = """
+let divergenceChart, pnlChart, efficiencyChart;
+let currentHours = 24;
+
+// Position data and sort state
+let positionsData = [];
+let sortConfig = {
+    primary: 'whale_size',      // 'whale_size', 'deviation', or 'pnl_impact'
+    whale_size_desc: true,      // true = descending (largest first)
+    deviation_asc: true,        // true = ascending (most negative first)
+    pnl_impact_desc: true       // true = descending (largest positive first)
+};
+
+// Elements touched on every refresh, looked up once (the script runs
+// after the markup, so they all exist by now)
+const byId = id => document.getElementById(id);
+const dom = {
+    pnlVsExpected: byId('pnl-vs-expected'),
+    efficiency: byId('efficiency'),
+    effBar: byId('efficiency-bar'),
+    expectedPnl: byId('expected-pnl'),
+    status: byId('status'),
+    statusDetail: byId('status-detail'),
+    user1Value: byId('user1-value'),
+    user1Pnl: byId('user1-pnl'),
+    user2Value: byId('user2-value'),
+    user2Pnl: byId('user2-pnl'),
+    lastUpdate: byId('last-update'),
+    user1Label: byId('user1-label'),
+    user2Label: byId('user2-label'),
+    scalingRatio: byId('scaling-ratio'),
+    divergenceCanvas: byId('divergenceChart'),
+    pnlCanvas: byId('pnlChart'),
+    efficiencyCanvas: byId('efficiencyChart'),
+    sortWhale: byId('sort-whale-size'),
+    sortDeviation: byId('sort-deviation'),
+    sortPnl: byId('sort-pnl-impact'),
+    thWhale: byId('th-whale-size'),
+    thDeviation: byId('th-deviation'),
+    thPnl: byId('th-pnl-impact'),
+    matchedPositions: byId('matched-positions'),
+    avgFillRate: byId('avg-fill-rate'),
+    expectedFillRate: byId('expected-fill-rate'),
+    fillEfficiency: byId('fill-efficiency'),
+    deviationPnl: byId('deviation-pnl'),
+    onTargetCount: byId('on-target-count'),
+    overfilledCount: byId('overfilled-count'),
+    underfilledCount: byId('underfilled-count'),
+    missedCount: byId('missed-count'),
+    positionsCount: byId('positions-count'),
+};
+
+// Shared formatters: toLocaleString() with options builds a new
+// Intl.NumberFormat on every call
+const MONEY_FMT_OPTIONS = { minimumFractionDigits: 2, maximumFractionDigits: 2 };
+const SIZE_FMT_OPTIONS = { maximumFractionDigits: 0 };
+const MONEY_FMT = new Intl.NumberFormat('en-US', MONEY_FMT_OPTIONS);
+const SIZE_FMT = new Intl.NumberFormat(undefined, SIZE_FMT_OPTIONS);
+const TICK_FMT = new Intl.NumberFormat();  // same output as v.toLocaleString()
+
+function formatMoney(val, showSign = false) {
+    if (val === null || val === undefined) return '--';
+    const sign = showSign && val >= 0 ? '+' : '';
+    return sign + '$' + MONEY_FMT.format(val);
+}
+
+function formatPercent(val) {
+    if (val === null || val === undefined) return '--';
+    return val.toFixed(1) + '%';
+}
+
+// Write-only DOM helpers that skip unchanged values, so a refresh with
+// the same numbers invalidates no style or layout at all
+function setText(el, text) {
+    if (el._text !== text) {
+        el.textContent = text;
+        el._text = text;
+    }
+}
+
+function setClass(el, cls) {
+    if (el._cls !== cls) {
+        el.className = cls;
+        el._cls = cls;
+    }
+}
+
+function setStyle(el, prop, value) {
+    const key = '_style_' + prop;
+    if (el[key] !== value) {
+        el.style[prop] = value;
+        el[key] = value;
+    }
+}
+
+function updateLatest(data) {
+    if (!data || !data.timestamp) return;
+
+    // Compute everything first...
+    const diff = data.pnl_vs_expected;
+    const eff = data.pnl_efficiency;
+    let statusText, statusClass, statusDetail;
+    if (diff > 0) {
+        statusText = 'OUTPERFORM';
+        statusClass = 'value positive';
+        statusDetail = 'Beating expected by ' + formatMoney(diff);
+    } else if (diff < 0) {
+        statusText = 'UNDERPERFORM';
+        statusClass = 'value negative';
+        statusDetail = 'Behind expected by ' + formatMoney(-diff);
+    } else {
+        statusText = 'TRACKING';
+        statusClass = 'value';
+        statusDetail = 'On target';
+    }
+    const pnlColor = v => v >= 0 ? '#4ade80' : '#f87171';
+
+    // ...then write in one pass with no reads in between
+    setText(dom.pnlVsExpected, formatMoney(diff, true));
+    setClass(dom.pnlVsExpected, 'value ' + (diff >= 0 ? 'positive' : 'negative'));
+
+    setText(dom.efficiency, formatPercent(eff));
+    if (eff !== null) {
+        const width = Math.min(Math.max(eff, 0), 200);
+        setStyle(dom.effBar, 'width', (width / 2) + '%');
+        setStyle(dom.effBar, 'background', eff >= 100 ? '#4ade80' : '#f87171');
+    }
+
+    setText(dom.expectedPnl, formatMoney(data.expected_pnl, true));
+
+    setText(dom.status, statusText);
+    setClass(dom.status, statusClass);
+    setText(dom.statusDetail, statusDetail);
+
+    setText(dom.user1Value, formatMoney(data.user1_value));
+    setText(dom.user1Pnl, formatMoney(data.user1_pnl, true));
+    setStyle(dom.user1Pnl, 'color', pnlColor(data.user1_pnl));
+
+    setText(dom.user2Value, formatMoney(data.user2_value));
+    setText(dom.user2Pnl, formatMoney(data.user2_pnl, true));
+    setStyle(dom.user2Pnl, 'color', pnlColor(data.user2_pnl));
+
+    setText(dom.lastUpdate, new Date(data.timestamp).toLocaleTimeString());
+}
+
+// Charts take pre-parsed {x, y} points (parsing: false) so the
+// decimation plugin can thin long ranges down to the canvas width
+// Line charts don't need full retina resolution; capping the backing
+// store's pixel ratio cuts the pixels filled on every redraw
+const CHART_DPR = Math.min(window.devicePixelRatio || 1, 1.5);
+
+function decimationFor(canvas) {
+    return {
+        enabled: true,
+        algorithm: 'lttb',
+        samples: Math.ceil(canvas.clientWidth * CHART_DPR),
+        threshold: 500,
+    };
+}
+
+// Chart series are persistent {x, y} arrays bound once to the datasets;
+// periodic refreshes append the new tail in place instead of rebuilding.
+const SERIES_KEYS = ['pnl_vs_expected', 'user1_pnl', 'expected_pnl', 'user2_pnl', 'pnl_efficiency'];
+let chartSeries = null;  // {hours, lastTimestamp, data: {key: [{x, y}, ...]}}
+
+function appendPoints(snapshots) {
+    for (const s of snapshots) {
+        const x = Date.parse(s.timestamp);
+        for (const key of SERIES_KEYS) {
+            chartSeries.data[key].push({ x: x, y: s[key] });
         }
-        .user-card {
-            background: #1a1a1a;
-            border-radius: 12px;
-            padding: 20px;
-            border: 1px solid #2a2a2a;
+    }
+    if (snapshots.length > 0) {
+        chartSeries.lastTimestamp = snapshots[snapshots.length - 1].timestamp;
+    }
+}
+
+// Charts scrolled out of view skip their redraws; the update is replayed when
+// the canvas comes back near the viewport
+const visibleCanvases = new WeakSet();
+const chartsPendingUpdate = new Set();
+const chartObserver = 'IntersectionObserver' in window
+    ? new IntersectionObserver(entries => {
+        for (const e of entries) {
+            if (!e.isIntersecting) {
+                visibleCanvases.delete(e.target);
+                continue;
+            }
+            visibleCanvases.add(e.target);
+            for (const chart of chartsPendingUpdate) {
+                if (chart.canvas === e.target) {
+                    chartsPendingUpdate.delete(chart);
+                    chart.update('none');
+                }
+            }
         }
-        .user-card h2 {
-            font-size: 18px;
-            margin-bottom: 15px;
-            display: flex;
-            align-items: center;
-            gap: 10px;
+    }, { rootMargin: '200px' })
+    : null;
+
+function refreshChart(chart) {
+    if (!chartObserver || visibleCanvases.has(chart.canvas)) {
+        chart.update('none');
+    } else {
+        chartsPendingUpdate.add(chart);
+    }
+}
+
+function appendCharts(snapshots) {
+    appendPoints(snapshots);
+
+    // Drop points that have scrolled out of the selected range (one splice per series)
+    const cutoff = Date.now() - chartSeries.hours * 3600 * 1000;
+    const first = chartSeries.data[SERIES_KEYS[0]];
+    let stale = 0;
+    while (stale < first.length && first[stale].x < cutoff) stale++;
+    if (stale > 0) {
+        for (const key of SERIES_KEYS) chartSeries.data[key].splice(0, stale);
+    }
+
+    refreshChart(divergenceChart);
+    refreshChart(pnlChart);
+    refreshChart(efficiencyChart);
+}
+
+// Full-load projection: one pass over the snapshots filling
+// preallocated per-series arrays by index
+function projectSnapshots(snapshots) {
+    const n = snapshots.length;
+    const div = new Array(n), u1 = new Array(n), exp = new Array(n), u2 = new Array(n), eff = new Array(n);
+    for (let i = 0; i < n; i++) {
+        const s = snapshots[i];
+        const x = Date.parse(s.timestamp);
+        div[i] = { x: x, y: s.pnl_vs_expected };
+        u1[i] = { x: x, y: s.user1_pnl };
+        exp[i] = { x: x, y: s.expected_pnl };
+        u2[i] = { x: x, y: s.user2_pnl };
+        eff[i] = { x: x, y: s.pnl_efficiency };
+    }
+    return { pnl_vs_expected: div, user1_pnl: u1, expected_pnl: exp, user2_pnl: u2, pnl_efficiency: eff };
+}
+
+// The three dashboard charts share one line-chart configuration and differ
+// only in datasets, y-axis tick format and legend
+const formatDollarTick = v => '$' + TICK_FMT.format(v);
+
+function lineDataset(label, data, borderColor, extra) {
+    return Object.assign({
+        label: label,
+        data: data,
+        borderColor: borderColor,
+        tension: 0.3,
+        pointRadius: 0,
+        spanGaps: true,
+    }, extra);
+}
+
+// Chart.js fills in defaults on the options object it is given, so every
+// chart gets its own tree rather than a shared frozen one
+function makeLineChart(canvas, datasets, yTickFormat, legend = { display: false }, extraOptions = {}) {
+    return new Chart(canvas, {
+        type: 'line',
+        data: { datasets: datasets },
+        options: Object.assign({
+            responsive: true,
+            maintainAspectRatio: false,
+            parsing: false,
+            normalized: true,
+            animation: false,
+            devicePixelRatio: CHART_DPR,
+            plugins: {
+                decimation: decimationFor(canvas),
+                legend: legend
+            },
+            scales: {
+                x: {
+                    type: 'time',
+                    grid: { color: '#2a2a2a' },
+                    ticks: { color: '#888' }
+                },
+                y: {
+                    grid: { color: '#2a2a2a' },
+                    ticks: {
+                        color: '#888',
+                        callback: yTickFormat
+                    }
+                }
+            }
+        }, extraOptions)
+    });
+}
+
+// True when `snapshots` is the plotted series plus newer rows: same range,
+// same first point, and the last plotted point unchanged at the same index
+function extendsChartSeries(snapshots, hours) {
+    if (!chartSeries || !divergenceChart || chartSeries.hours !== hours) return false;
+    const n = chartSeries.data[SERIES_KEYS[0]].length;
+    if (n === 0 || snapshots.length < n) return false;
+    const first = snapshots[0], last = snapshots[n - 1];
+    const firstX = Date.parse(first.timestamp), lastX = Date.parse(last.timestamp);
+    return SERIES_KEYS.every(key => {
+        const points = chartSeries.data[key];
+        return points[0].x === firstX && points[n - 1].x === lastX && points[n - 1].y === last[key];
+    });
+}
+
+function updateCharts(snapshots, labels, hours) {
+    // Reload of the same range that only adds points: push the new tail onto the
+    // existing datasets instead of swapping every array wholesale
+    if (extendsChartSeries(snapshots, hours)) {
+        appendPoints(snapshots.slice(chartSeries.data[SERIES_KEYS[0]].length));
+        refreshChart(divergenceChart);
+        refreshChart(pnlChart);
+        refreshChart(efficiencyChart);
+        return;
+    }
+
+    chartSeries = {
+        hours: hours,
+        lastTimestamp: snapshots.length > 0 ? snapshots[snapshots.length - 1].timestamp : null,
+        data: projectSnapshots(snapshots),
+    };
+    const series = key => chartSeries.data[key];
+
+    // PNL vs Expected chart
+    const divergenceData = series('pnl_vs_expected');
+    if (divergenceChart) {
+        divergenceChart.data.datasets[0].data = divergenceData;
+        refreshChart(divergenceChart);
+    } else {
+        divergenceChart = makeLineChart(dom.divergenceCanvas, [
+            lineDataset('PNL vs Expected', divergenceData, '#4ade80', {
+                backgroundColor: 'rgba(74, 222, 128, 0.1)',
+                fill: true,
+            }),
+        ], formatDollarTick);
+    }
+
+    // PNL Comparison chart
+    const user1Pnl = series('user1_pnl');
+    const user2Pnl = series('user2_pnl');
+    const expectedPnl = series('expected_pnl');
+
+    if (pnlChart) {
+        pnlChart.data.datasets[0].data = user1Pnl;
+        pnlChart.data.datasets[1].data = expectedPnl;
+        pnlChart.data.datasets[2].data = user2Pnl;
+        refreshChart(pnlChart);
+    } else {
+        pnlChart = makeLineChart(dom.pnlCanvas, [
+            lineDataset(labels.user1_label + ' (Actual)', user1Pnl, '#60a5fa'),
+            lineDataset('Expected (' + (labels.scaling_ratio * 100) + '%)', expectedPnl, '#a78bfa', {
+                borderDash: [5, 5],
+            }),
+            lineDataset(labels.user2_label + ' (Whale)', user2Pnl, '#fbbf24'),
+        ], formatDollarTick, { labels: { color: '#888' } });
+    }
+
+    // Efficiency chart
+    const efficiencyData = series('pnl_efficiency');
+    if (efficiencyChart) {
+        efficiencyChart.data.datasets[0].data = efficiencyData;
+        refreshChart(efficiencyChart);
+    } else {
+        efficiencyChart = makeLineChart(dom.efficiencyCanvas, [
+            lineDataset('Copy Efficiency %', efficiencyData, '#f472b6'),
+        ], v => v.toFixed(0) + '%', { display: false }, {
+            annotations: {
+                line1: {
+                    type: 'line',
+                    yMin: 100,
+                    yMax: 100,
+                    borderColor: '#4ade80',
+                    borderDash: [5, 5],
+                }
+            }
+        });
+    }
+}
+
+// Resolves on the next animation frame, so renders that follow a fetch land
+// between frames instead of competing with scrolling and input
+const nextFrame = () => new Promise(resolve => requestAnimationFrame(resolve));
+
+async function loadHistory(hours) {
+    currentHours = hours;
+
+    // Update button states
+    document.querySelectorAll('.time-selector button').forEach(btn => {
+        btn.classList.remove('active');
+    });
+    document.getElementById('btn-' + hours + 'h').classList.add('active');
+
+    try {
+        // Let the server reduce the series to what the chart can actually draw
+        const width = dom.divergenceCanvas.clientWidth;
+        const resp = await fetch('/api/history?hours=' + hours + '&width=' + width + '&dpr=' + CHART_DPR);
+        const data = await resp.json();
+        await nextFrame();
+
+        if (data.snapshots && data.snapshots.length > 0) {
+            updateCharts(data.snapshots, data, hours);
+
+            // Update labels if provided
+            if (data.user1_label) {
+                dom.user1Label.textContent = data.user1_label;
+            }
+            if (data.user2_label) {
+                dom.user2Label.textContent = data.user2_label;
+            }
+            if (data.scaling_ratio) {
+                dom.scalingRatio.textContent = (data.scaling_ratio * 100) + '%';
+            }
         }
-        .user-card.user1 h2 { color: #60a5fa; }
-        .user-card.user2 h2 { color: #fbbf24; }
-        .metric {
-            display: flex;
-            justify-content: space-between;
-            padding: 8px 0;
-            border-bottom: 1px solid #2a2a2a;
+    } catch (e) {
+        console.error('Error loading history:', e);
+    }
+}
+
+// Coalesce latest-snapshot renders into at most one per animation frame;
+// while the tab is hidden only the newest pending snapshot gets drawn
+let pendingLatest = null;
+let latestFrameScheduled = false;
+
+function scheduleLatest(data) {
+    pendingLatest = data;
+    if (latestFrameScheduled) return;
+    latestFrameScheduled = true;
+    requestAnimationFrame(() => {
+        latestFrameScheduled = false;
+        updateLatest(pendingLatest);
+    });
+}
+
+async function refreshHistory() {
+    if (!chartSeries || chartSeries.hours !== currentHours || !chartSeries.lastTimestamp) {
+        return loadHistory(currentHours);
+    }
+    try {
+        const resp = await fetch('/api/history?hours=' + currentHours +
+                                 '&since=' + encodeURIComponent(chartSeries.lastTimestamp));
+        const data = await resp.json();
+        await nextFrame();
+        if (data.snapshots && chartSeries.hours === currentHours) {
+            appendCharts(data.snapshots);
         }
-        .metric:last-child { border-bottom: none; }
-        .metric .label { color: #888; }
-        .metric .val { font-weight: 600; }
-        .chart-container {
-            background: #1a1a1a;
-            border-radius: 12px;
-            padding: 20px;
-            border: 1px solid #2a2a2a;
-            margin-bottom: 20px;
+    } catch (e) {
+        console.error('Error refreshing history:', e);
+    }
+}
+
+// Timestamp of the newest snapshot rendered; later polls only get a body when it changes
+let lastSnapshotTs = null;
+
+async function loadLatest() {
+    try {
+        const resp = await fetch(lastSnapshotTs
+            ? '/api/latest?since=' + encodeURIComponent(lastSnapshotTs)
+            : '/api/latest');
+        if (resp.status === 204) return;
+        const data = await resp.json();
+        if (data.timestamp) lastSnapshotTs = data.timestamp;
+        scheduleLatest(data);
+    } catch (e) {
+        console.error('Error loading latest:', e);
+    }
+}
+
+// Position comparison functions
+function toggleSort(column) {
+    if (column === 'whale_size') {
+        if (sortConfig.primary === 'whale_size') {
+            // Toggle direction
+            sortConfig.whale_size_desc = !sortConfig.whale_size_desc;
+        } else {
+            // Switch to whale_size as primary
+            sortConfig.primary = 'whale_size';
         }
-        .chart-container h3 {
-            color: #fff;
-            margin-bottom: 15px;
-            font-size: 16px;
+    } else if (column === 'deviation') {
+        if (sortConfig.primary === 'deviation') {
+            // Toggle direction
+            sortConfig.deviation_asc = !sortConfig.deviation_asc;
+        } else {
+            // Switch to deviation as primary
+            sortConfig.primary = 'deviation';
         }
-        .chart-wrapper {
-            height: 300px;
+    } else if (column === 'pnl_impact') {
+        if (sortConfig.primary === 'pnl_impact') {
+            // Toggle direction
+            sortConfig.pnl_impact_desc = !sortConfig.pnl_impact_desc;
+        } else {
+            // Switch to pnl_impact as primary
+            sortConfig.primary = 'pnl_impact';
         }
-        .status-bar {
-            position: fixed;
-            bottom: 0;
-            left: 0;
-            right: 0;
-            background: #1a1a1a;
-            border-top: 1px solid #2a2a2a;
-            padding: 10px 20px;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            font-size: 12px;
+    }
+    updateSortIndicators();
+    renderPositionsTable();
+}
+
+function updateSortIndicators() {
+    // Update arrows based on current direction settings
+    setText(dom.sortWhale, sortConfig.whale_size_desc ? '▼' : '▲');
+    setText(dom.sortDeviation, sortConfig.deviation_asc ? '▲' : '▼');
+    setText(dom.sortPnl, sortConfig.pnl_impact_desc ? '▼' : '▲');
+
+    // Highlight the active sort column
+    dom.thWhale.classList.toggle('active-sort', sortConfig.primary === 'whale_size');
+    dom.thDeviation.classList.toggle('active-sort', sortConfig.primary === 'deviation');
+    dom.thPnl.classList.toggle('active-sort', sortConfig.primary === 'pnl_impact');
+}
+
+// Comparator per primary column; directions are resolved once per sort,
+// not on every comparison
+const POSITION_COMPARATORS = {
+    // Primary: whale size, secondary: deviation
+    whale_size: (whaleSign, devSign) => (a, b) => {
+        const whaleA = a.whale.size;
+        const whaleB = b.whale.size;
+        if (whaleA !== whaleB) return whaleSign * (whaleA - whaleB);
+        return devSign * (a.fill_rate_deviation - b.fill_rate_deviation);
+    },
+    // Primary: deviation, secondary: whale size
+    deviation: (whaleSign, devSign) => (a, b) => {
+        const devA = a.fill_rate_deviation;
+        const devB = b.fill_rate_deviation;
+        if (devA !== devB) return devSign * (devA - devB);
+        return whaleSign * (a.whale.size - b.whale.size);
+    },
+    // Primary: pnl impact, secondary: whale size
+    pnl_impact: (whaleSign, devSign, pnlSign) => (a, b) => {
+        const pnlA = a.deviation_pnl_impact;
+        const pnlB = b.deviation_pnl_impact;
+        if (pnlA !== pnlB) return pnlSign * (pnlA - pnlB);
+        return whaleSign * (a.whale.size - b.whale.size);
+    },
+};
+
+function sortPositions(comparisons) {
+    const makeComparator = POSITION_COMPARATORS[sortConfig.primary];
+    if (!makeComparator) return [...comparisons];
+    return [...comparisons].sort(makeComparator(
+        sortConfig.whale_size_desc ? -1 : 1,
+        sortConfig.deviation_asc ? 1 : -1,
+        sortConfig.pnl_impact_desc ? -1 : 1,
+    ));
+}
+
+// Index order for the current sort state. The server ships every order
+// precomputed; sortPositions is only a fallback for older cached payloads.
+let positionOrders = null;
+
+function currentPositionOrder() {
+    const primary = sortConfig.primary;
+    const ascending = {
+        whale_size: !sortConfig.whale_size_desc,
+        deviation: sortConfig.deviation_asc,
+        pnl_impact: !sortConfig.pnl_impact_desc,
+    };
+    const secondary = primary === 'whale_size' ? 'deviation' : 'whale_size';
+    return positionOrders[primary][ascending[primary] ? 'asc' : 'desc'][ascending[secondary] ? 'asc' : 'desc'];
+}
+
+// The positions table is windowed: only rows inside the scroll viewport
+// (plus an overscan margin) are in the DOM, with spacer rows standing in
+// for the rest. Rows have a fixed height so no measuring is needed.
+const POSITION_ROW_HEIGHT = 56;  // keep in sync with .pos-row in the stylesheet
+const POSITION_OVERSCAN = 10;
+let positionRows = [];  // pre-rendered <tr> markup, index-aligned with the server's comparisons
+let positionKeys = [];  // asset id per positionRows entry
+// asset -> { html, node }: parsed rows, kept across reloads while their markup is unchanged
+const positionRowNodes = new Map();
+let sortedRows = [];  // positionRows indices in display order
+let positionsVersion = 0;  // bumped on every /api/positions load
+let sortedRowsKey = null;  // (data version, sort state) sortedRows was built for
+let positionsFrame = 0;
+
+// Row styling by fill state: (over 4 / under 2 / on target 0) + (has position 1)
+const FILL_STATE_DEV_CLASS = ['dev-ok', 'dev-ok', 'dev-missed', 'dev-under', 'dev-over', 'dev-over'];
+const FILL_STATE_ICON = ['❌', '✅', '❌', '📉', '❌', '📈'];
+
+function positionRowHtml(c) {
+    const fillRatePct = (c.fill_rate * 100).toFixed(2);
+    const deviationPct = (c.fill_rate_deviation * 100).toFixed(2);
+    const fillState = (c.fill_rate_deviation > 0.01 ? 4 : c.fill_rate_deviation < -0.01 ? 2 : 0) +
+                      (c.has_position ? 1 : 0);
+    const devClass = FILL_STATE_DEV_CLASS[fillState];
+    const statusIcon = FILL_STATE_ICON[fillState];
+
+    const pnlClass = c.deviation_pnl_impact >= 0 ? 'pnl-pos' : 'pnl-neg';
+
+    // Truncate title
+    const title = c.title.length > 50 ? c.title.substring(0, 47) + '...' : c.title;
+    const polymarketUrl = c.slug ? 'https://polymarket.com/event/' + c.slug : '#';
+
+    return '<tr class="pos-row">' +
+        '<td class="pos-market">' +
+            '<a href="' + polymarketUrl + '" target="_blank">' + statusIcon + ' ' + title + '</a>' +
+            '<div class="pos-outcome">' + c.outcome + '</div>' +
+        '</td>' +
+        '<td>' + SIZE_FMT.format(c.whale.size) + '</td>' +
+        '<td>' + SIZE_FMT.format(c.expected_size) + '</td>' +
+        '<td>' + SIZE_FMT.format(c.actual_size) + '</td>' +
+        '<td>' + fillRatePct + '%</td>' +
+        '<td class="' + devClass + '">' + (c.fill_rate_deviation >= 0 ? '+' : '') + deviationPct + '%</td>' +
+        '<td class="' + pnlClass + '">' + formatMoney(c.deviation_pnl_impact, true) + '</td>' +
+    '</tr>';
+}
+
+// Each row's markup is parsed once and the node reused until a reload changes
+// it; scrolling, re-sorting and refreshes then mostly move existing <tr> nodes
+const rowTemplate = document.createElement('template');
+
+function positionRowNode(i) {
+    const key = positionKeys[i];
+    const html = positionRows[i];
+    const cached = positionRowNodes.get(key);
+    if (cached && cached.html === html) return cached.node;
+    rowTemplate.innerHTML = html;
+    const node = rowTemplate.content.firstElementChild;
+    positionRowNodes.set(key, { html, node });
+    return node;
+}
+
+// Forget parsed rows for positions that are gone after a reload
+function prunePositionRowNodes() {
+    const live = new Set(positionKeys);
+    for (const key of positionRowNodes.keys()) {
+        if (!live.has(key)) positionRowNodes.delete(key);
+    }
+}
+
+function makeSpacerRow() {
+    const row = document.createElement('tr');
+    const cell = document.createElement('td');
+    cell.colSpan = 7;
+    row.appendChild(cell);
+    return row;
+}
+
+const topSpacer = makeSpacerRow();
+const bottomSpacer = makeSpacerRow();
+
+// [first, last) row indices currently in the tbody
+let renderedRange = null;
+
+// Scrolling only rebuilds the tbody once the viewport leaves the rows
+// already rendered (visible rows plus overscan); `force` after a re-sort/reload
+function renderPositionsWindow(force = false) {
+    const container = document.getElementById('positions-table');
+    const total = sortedRows.length;
+    const visibleFirst = Math.floor(container.scrollTop / POSITION_ROW_HEIGHT);
+    const visibleLast = Math.min(total, Math.ceil((container.scrollTop + container.clientHeight) / POSITION_ROW_HEIGHT));
+    if (!force && renderedRange && visibleFirst >= renderedRange[0] && visibleLast <= renderedRange[1]) {
+        return;
+    }
+    const first = Math.max(0, visibleFirst - POSITION_OVERSCAN);
+    const last = Math.min(total, visibleLast + POSITION_OVERSCAN);
+    renderedRange = [first, last];
+
+    const rows = [];
+    if (first > 0) {
+        topSpacer.style.height = first * POSITION_ROW_HEIGHT + 'px';
+        rows.push(topSpacer);
+    }
+    for (let i = first; i < last; i++) {
+        rows.push(positionRowNode(sortedRows[i]));
+    }
+    if (last < total) {
+        bottomSpacer.style.height = (total - last) * POSITION_ROW_HEIGHT + 'px';
+        rows.push(bottomSpacer);
+    }
+    document.getElementById('positions-tbody').replaceChildren(...rows);
+}
+
+function onPositionsScroll() {
+    if (positionsFrame || sortedRows.length === 0) return;
+    positionsFrame = requestAnimationFrame(() => {
+        positionsFrame = 0;
+        renderPositionsWindow();
+    });
+}
+
+function renderPositionsTable() {
+    const tbody = document.getElementById('positions-tbody');
+
+    if (positionRows.length === 0) {
+        sortedRows = [];
+        sortedRowsKey = null;
+        renderedRange = null;
+        tbody.innerHTML = '<tr><td colspan="7" style="text-align: center; padding: 40px; color: #666;">No positions found</td></tr>';
+        return;
+    }
+
+    const key = positionsVersion + '|' + sortConfig.primary + '|' + sortConfig.whale_size_desc +
+                '|' + sortConfig.deviation_asc + '|' + sortConfig.pnl_impact_desc;
+    if (key !== sortedRowsKey) {
+        if (positionOrders) {
+            sortedRows = currentPositionOrder();
+        } else {
+            const index = new Map(positionsData.map((c, i) => [c, i]));
+            sortedRows = sortPositions(positionsData).map(c => index.get(c));
         }
-        .status-bar .dot {
-            width: 8px;
-            height: 8px;
-            border-radius: 50%;
-            background: #4ade80;
-            display: inline-block;
-            margin-right: 8px;
-            animation: pulse 2s infinite;
+        sortedRowsKey = key;
+    }
+    renderPositionsWindow(true);
+}
+
+// /api/positions can carry thousands of rows: a worker parses the payload and
+// pre-renders every row, so the main thread only copies strings into the tbody.
+// Its source is assembled from the same formatting functions the page uses.
+function positionsWorkerMain() {
+    self.onmessage = e => {
+        const { id, buf } = e.data;
+        try {
+            const data = JSON.parse(new TextDecoder().decode(buf));
+            if (Array.isArray(data.comparisons)) {
+                data.rows = data.comparisons.map(c => positionRowHtml(c));
+                data.keys = data.comparisons.map(c => c.asset);
+                // Rows and keys plus the server's sort orders are all the table needs
+                if (data.sort_orders) delete data.comparisons;
+            }
+            self.postMessage({ id, data });
+        } catch (err) {
+            self.postMessage({ id, error: String(err) });
         }
-        @keyframes pulse {
-            0%, 100% { opacity: 1; }
-            50% { opacity: 0.5; }
+    };
+}
+
+let positionsWorker = null;
+let positionsRequestId = 0;
+const positionsRequests = new Map();
+
+try {
+    const src = [
+        'const MONEY_FMT = new Intl.NumberFormat("en-US", ' + JSON.stringify(MONEY_FMT_OPTIONS) + ');',
+        'const SIZE_FMT = new Intl.NumberFormat(undefined, ' + JSON.stringify(SIZE_FMT_OPTIONS) + ');',
+        'const FILL_STATE_DEV_CLASS = ' + JSON.stringify(FILL_STATE_DEV_CLASS) + ';',
+        'const FILL_STATE_ICON = ' + JSON.stringify(FILL_STATE_ICON) + ';',
+        formatMoney.toString(),
+        positionRowHtml.toString(),
+        '(' + positionsWorkerMain.toString() + ')();',
+    ].join('\\n');
+    positionsWorker = new Worker(URL.createObjectURL(new Blob([src], { type: 'text/javascript' })));
+    positionsWorker.onmessage = e => {
+        const request = positionsRequests.get(e.data.id);
+        positionsRequests.delete(e.data.id);
+        if (!request) return;
+        if (e.data.error) request.reject(new Error(e.data.error));
+        else request.resolve(e.data.data);
+    };
+} catch (e) {
+    positionsWorker = null;  // no worker support: parse and render on the main thread
+}
+
+async function fetchPositions() {
+    const resp = await fetch('/api/positions');
+    if (!positionsWorker) {
+        const data = await resp.json();
+        if (Array.isArray(data.comparisons)) {
+            data.rows = data.comparisons.map(c => positionRowHtml(c));
+            data.keys = data.comparisons.map(c => c.asset);
         }
-        .time-selector {
-            display: flex;
-            gap: 10px;
-            margin-bottom: 20px;
-            justify-content: center;
+        return data;
+    }
+    const buf = await resp.arrayBuffer();
+    return new Promise((resolve, reject) => {
+        const id = ++positionsRequestId;
+        positionsRequests.set(id, { resolve, reject });
+        positionsWorker.postMessage({ id, buf }, [buf]);
+    });
+}
+
+async function loadPositions() {
+    const tbody = document.getElementById('positions-tbody');
+    // Refreshes keep the current rows (and scroll position) on screen until the new data is in
+    if (positionRows.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="7" style="text-align: center; padding: 40px; color: #888;">Loading positions...</td></tr>';
+    }
+
+    try {
+        const data = await fetchPositions();
+        await nextFrame();
+
+        if (data.error) {
+            tbody.innerHTML = '<tr><td colspan="7" style="text-align: center; padding: 40px; color: #f87171;">Error: ' + data.error + '</td></tr>';
+            return;
         }
-        .time-selector button {
-            background: #2a2a2a;
-            border: none;
-            color: #888;
-            padding: 8px 16px;
-            border-radius: 6px;
-            cursor: pointer;
-            transition: all 0.2s;
+
+        // Everything below runs in this one frame. The table goes first: it is the
+        // only part that reads layout (scroll position), so that read happens before
+        // any of this frame's writes and cannot force an extra layout pass.
+
+        // Store all positions (no limit)
+        positionsData = data.comparisons || [];
+        positionRows = data.rows || [];
+        positionKeys = data.keys || [];
+        prunePositionRowNodes();
+        positionOrders = data.sort_orders || null;
+        positionsVersion++;
+        renderPositionsTable();
+
+        // Update summary (unchanged values are not rewritten)
+        const s = data.summary;
+        setText(dom.matchedPositions, s.matched_positions + ' / ' + s.whale_positions);
+        setText(dom.avgFillRate, (s.avg_fill_rate * 100).toFixed(2) + '%');
+        setText(dom.expectedFillRate, (s.expected_fill_rate * 100) + '%');
+        setText(dom.fillEfficiency, s.fill_rate_efficiency.toFixed(1) + '%');
+        setClass(dom.fillEfficiency, 'value ' + (s.fill_rate_efficiency >= 100 ? 'positive' : 'negative'));
+        setText(dom.deviationPnl, formatMoney(s.total_deviation_pnl, true));
+        setClass(dom.deviationPnl, 'value ' + (s.total_deviation_pnl >= 0 ? 'positive' : 'negative'));
+        setText(dom.onTargetCount, s.on_target_count);
+        setText(dom.overfilledCount, s.overfilled_count);
+        setText(dom.underfilledCount, s.underfilled_count);
+        setText(dom.missedCount, s.missed_count);
+        setText(dom.positionsCount, '(' + positionRows.length + ' positions)');
+
+        // Update sort indicators
+        updateSortIndicators();
+
+        // Render new Performance Analysis tables
+        renderFillStatusTable(data.pnl_by_fill_status);
+        renderSizeBucketTable(data.size_bucket_analysis);
+        renderPerformanceInsight(data);
+
+    } catch (e) {
+        console.error('Error loading positions:', e);
+        tbody.innerHTML = '<tr><td colspan="7" style="text-align: center; padding: 40px; color: #f87171;">Error loading positions</td></tr>';
+    }
+}
+
+const VERDICT_NONE = ['', '#888'];
+const FILL_STATUS_VERDICTS = {
+    overfilled: [['BAD - Overfilled losers', '#f87171'], VERDICT_NONE, ['GOOD - Overfilled winners', '#4ade80']],
+    underfilled: [['GOOD - Underfilled losers', '#4ade80'], VERDICT_NONE, ['BAD - Underfilled winners', '#f87171']],
+    missed: [['GOOD - Dodged losers', '#4ade80'], VERDICT_NONE, ['BAD - Missed winners', '#f87171']],
+};
+
+function renderFillStatusTable(pnlByFillStatus) {
+    const tbody = document.getElementById('fill-status-tbody');
+    if (!pnlByFillStatus) {
+        tbody.innerHTML = '<tr><td colspan="6" style="text-align: center; padding: 20px; color: #666;">No data</td></tr>';
+        return;
+    }
+
+    const statusConfig = {
+        'overfilled': { label: 'Overfilled (>1% over)', color: '#60a5fa', icon: '📈' },
+        'underfilled': { label: 'Underfilled (<1% under)', color: '#fbbf24', icon: '📉' },
+        'on_target': { label: 'On Target (±1%)', color: '#4ade80', icon: '✅' },
+        'missed': { label: 'Missed Entirely', color: '#f87171', icon: '❌' },
+    };
+
+    let html = '';
+    for (const [status, stats] of Object.entries(pnlByFillStatus)) {
+        const cfg = statusConfig[status] || { label: status, color: '#888', icon: '?' };
+        const whalePnlColor = stats.whale_pnl >= 0 ? '#4ade80' : '#f87171';
+        const copierPnlColor = stats.copier_pnl >= 0 ? '#4ade80' : '#f87171';
+
+        // Determine verdict: [whale losing, flat, whale winning]
+        const verdicts = FILL_STATUS_VERDICTS[status];
+        const [verdict, verdictColor] = verdicts
+            ? verdicts[Math.sign(stats.whale_pnl) + 1] || VERDICT_NONE
+            : ['Neutral', '#888'];
+
+        html += '<tr style="border-bottom: 1px solid #2a2a2a;">' +
+            '<td style="padding: 10px; color: ' + cfg.color + ';">' + cfg.icon + ' ' + cfg.label + '</td>' +
+            '<td style="text-align: right; padding: 10px;">' + stats.count + '</td>' +
+            '<td style="text-align: right; padding: 10px; color: ' + whalePnlColor + ';">' + formatMoney(stats.whale_pnl, true) + '</td>' +
+            '<td style="text-align: right; padding: 10px; color: ' + whalePnlColor + ';">' + formatMoney(stats.avg_whale_pnl, true) + '</td>' +
+            '<td style="text-align: right; padding: 10px; color: ' + copierPnlColor + ';">' + formatMoney(stats.copier_pnl, true) + '</td>' +
+            '<td style="text-align: right; padding: 10px; color: ' + verdictColor + '; font-weight: 600;">' + verdict + '</td>' +
+        '</tr>';
+    }
+    tbody.innerHTML = html;
+}
+
+function renderSizeBucketTable(sizeBucketAnalysis) {
+    const tbody = document.getElementById('size-bucket-tbody');
+    if (!sizeBucketAnalysis || sizeBucketAnalysis.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="7" style="text-align: center; padding: 20px; color: #666;">No data</td></tr>';
+        return;
+    }
+
+    let html = '';
+    for (const bucket of sizeBucketAnalysis) {
+        const whalePnlColor = bucket.whale_pnl >= 0 ? '#4ade80' : '#f87171';
+        const winRateColor = bucket.whale_win_rate >= 50 ? '#4ade80' : '#f87171';
+        const fillRatePct = (bucket.avg_fill_rate * 100).toFixed(2);
+        const vsTargetPct = bucket.fill_rate_vs_target.toFixed(0);
+        const vsTargetColor = bucket.fill_rate_vs_target >= 100 ? '#60a5fa' : '#fbbf24';
+
+        // Impact analysis: are you overfilling winners or losers?
+        let impact = '';
+        let impactColor = '#888';
+        const isOverfilling = bucket.fill_rate_vs_target > 105;
+        const isUnderfilling = bucket.fill_rate_vs_target < 95;
+        const isWinning = bucket.whale_pnl > 0;
+
+        if (isOverfilling && isWinning) {
+            impact = 'GOOD';
+            impactColor = '#4ade80';
+        } else if (isOverfilling && !isWinning) {
+            impact = 'BAD';
+            impactColor = '#f87171';
+        } else if (isUnderfilling && isWinning) {
+            impact = 'BAD';
+            impactColor = '#f87171';
+        } else if (isUnderfilling && !isWinning) {
+            impact = 'GOOD';
+            impactColor = '#4ade80';
+        } else {
+            impact = 'OK';
         }
-        .time-selector button:hover {
-            background: #3a3a3a;
-            color: #fff;
+
+        html += '<tr style="border-bottom: 1px solid #2a2a2a;">' +
+            '<td style="padding: 10px; font-weight: 600;">' + bucket.label + '</td>' +
+            '<td style="text-align: right; padding: 10px;">' + bucket.count + '</td>' +
+            '<td style="text-align: right; padding: 10px; color: ' + whalePnlColor + ';">' + formatMoney(bucket.whale_pnl, true) + '</td>' +
+            '<td style="text-align: right; padding: 10px; color: ' + winRateColor + ';">' + bucket.whale_win_rate.toFixed(0) + '%</td>' +
+            '<td style="text-align: right; padding: 10px;">' + fillRatePct + '%</td>' +
+            '<td style="text-align: right; padding: 10px; color: ' + vsTargetColor + ';">' + vsTargetPct + '%</td>' +
+            '<td style="text-align: right; padding: 10px; color: ' + impactColor + '; font-weight: 600;">' + impact + '</td>' +
+        '</tr>';
+    }
+    tbody.innerHTML = html;
+}
+
+function renderPerformanceInsight(data) {
+    const container = document.getElementById('performance-insight');
+    if (!data || !data.pnl_by_fill_status || !data.size_bucket_analysis) {
+        container.innerHTML = '<p style="color: #888;">No data available for analysis</p>';
+        return;
+    }
+
+    const fs = data.pnl_by_fill_status;
+    const buckets = data.size_bucket_analysis;
+
+    // Calculate key metrics
+    const overfillWhalePnl = fs.overfilled?.whale_pnl || 0;
+    const underfillWhalePnl = fs.underfilled?.whale_pnl || 0;
+    const missedWhalePnl = fs.missed?.whale_pnl || 0;
+
+    // Find large vs small bucket performance in one pass
+    // (a bucket can count as both, e.g. '500-1k')
+    let largePnl = 0, largeFillSum = 0, largeCount = 0;
+    let smallPnl = 0, smallFillSum = 0, smallCount = 0;
+    for (const b of buckets) {
+        if (b.label.includes('k') && !b.label.startsWith('0')) {
+            largePnl += b.whale_pnl;
+            largeFillSum += b.fill_rate_vs_target;
+            largeCount++;
         }
-        .time-selector button.active {
-            background: #4ade80;
-            color: #000;
+        if (b.label.startsWith('0') || b.label === '500-1k') {
+            smallPnl += b.whale_pnl;
+            smallFillSum += b.fill_rate_vs_target;
+            smallCount++;
         }
-        .efficiency-bar {
-            height: 20px;
-            background: #2a2a2a;
-            border-radius: 10px;
-            overflow: hidden;
-            margin-top: 10px;
+    }
+
+    const largeAvgFillVsTarget = largeCount > 0 ? largeFillSum / largeCount : 100;
+    const smallAvgFillVsTarget = smallCount > 0 ? smallFillSum / smallCount : 100;
+
+    // Build insight
+    let insights = [];
+
+    // Pattern 1: Overfilling losers
+    if (overfillWhalePnl < -50) {
+        insights.push('<span style="color: #f87171;">You are OVERFILLING positions where the whale is LOSING.</span> This magnifies your losses beyond the expected 8%.');
+    } else if (overfillWhalePnl > 50) {
+        insights.push('<span style="color: #4ade80;">You are OVERFILLING positions where the whale is WINNING.</span> This helps your performance.');
+    }
+
+    // Pattern 2: Underfilling winners
+    if (underfillWhalePnl > 100) {
+        insights.push('<span style="color: #f87171;">You are UNDERFILLING positions where the whale is WINNING.</span> You are missing out on gains.');
+    } else if (underfillWhalePnl < -100) {
+        insights.push('<span style="color: #4ade80;">You are UNDERFILLING positions where the whale is LOSING.</span> This protects you from losses.');
+    }
+
+    // Pattern 3: Large vs small trade analysis
+    if (largePnl < -100 && largeAvgFillVsTarget > 100) {
+        insights.push('<span style="color: #f87171;">CRITICAL: Large trades (1k+ shares) are LOSING and you are filling MORE than 8% on them.</span> Your aggressive execution on big trades is hurting you because the whale loses on these.');
+    } else if (largePnl > 100 && largeAvgFillVsTarget > 100) {
+        insights.push('<span style="color: #4ade80;">Large trades are WINNING and you are filling more - this is working in your favor.</span>');
+    }
+
+    if (smallPnl > 100 && smallAvgFillVsTarget < 100) {
+        insights.push('<span style="color: #f87171;">Small trades (under 1k shares) are WINNING but you are filling LESS than 8%.</span> You are missing gains on the whale\\'s winning small trades.');
+    } else if (smallPnl < -100 && smallAvgFillVsTarget < 100) {
+        insights.push('<span style="color: #4ade80;">Small trades are LOSING and you fill less - this is protecting you.</span>');
+    }
+
+    // Summary
+    let summary = '';
+    if (largePnl < 0 && largeAvgFillVsTarget > 100) {
+        summary = '<div style="margin-top: 15px; padding: 15px; background: #3a1a1a; border-radius: 6px; border-left: 3px solid #f87171;">' +
+            '<strong style="color: #f87171;">ROOT CAUSE IDENTIFIED:</strong> The whale is losing on large positions, and your aggressive execution (higher buffers, IOC orders) causes you to fill MORE on these large losers. ' +
+            'Meanwhile, you fill less on small trades where the whale may be winning. This creates systematic underperformance.' +
+            '</div>';
+    } else if (insights.length === 0) {
+        summary = '<p style="color: #888;">Fill patterns appear balanced. Performance divergence may be due to timing differences or market conditions.</p>';
+    }
+
+    container.innerHTML = (insights.length > 0 ? '<ul style="margin: 0; padding-left: 20px;">' + insights.map(i => '<li style="margin-bottom: 10px;">' + i + '</li>').join('') + '</ul>' : '') + summary;
+}
+
+document.getElementById('positions-table').addEventListener('scroll', onPositionsScroll, { passive: true });
+
+// Chart.js is loaded with defer so it doesn't block parsing; deferred
+// scripts have run by DOMContentLoaded, so start from there
+// One scheduler drives all auto-refreshes: a 5s tick that does nothing while
+// the tab is hidden and starts each task once its interval has elapsed and
+// its previous run has finished
+const POLL_TICK_MS = 5000;
+const pollTasks = [
+    { run: loadLatest, every: 30000, next: 0, running: false },
+    { run: refreshHistory, every: 60000, next: 0, running: false, panel: 'charts' },
+    { run: loadPositions, every: 300000, next: 0, running: false, panel: 'positions' },  // every 5 minutes
+];
+
+// Tasks tied to a panel only run while some part of it is on (or near) screen;
+// a task that fell due meanwhile runs as soon as its panel scrolls back in
+const panelVisibility = { charts: new Set(), positions: new Set() };
+const panelObserver = 'IntersectionObserver' in window
+    ? new IntersectionObserver(entries => {
+        let entered = false;
+        for (const e of entries) {
+            const visible = panelVisibility[e.target.dataset.panel];
+            if (e.isIntersecting) {
+                visible.add(e.target);
+                entered = true;
+            } else {
+                visible.delete(e.target);
+            }
         }
-        .efficiency-fill {
-            height: 100%;
-            transition: width 0.3s;
+        if (entered) pollTick();
+    }, { rootMargin: '200px' })
+    : null;
+
+function panelVisible(name) {
+    return !panelObserver || panelVisibility[name].size > 0;
+}
+
+async function runPollTask(task) {
+    task.running = true;
+    task.next = Date.now() + task.every;
+    try {
+        await task.run();
+    } finally {
+        task.running = false;
+    }
+}
+
+function pollTick() {
+    if (document.hidden) return;
+    const now = Date.now();
+    for (const task of pollTasks) {
+        if (!task.running && now >= task.next && (!task.panel || panelVisible(task.panel))) {
+            runPollTask(task);
         }
-    </style>
+    }
+}
+
+// Catch up on whatever fell due while the tab was hidden as soon as it is shown
+document.addEventListener('visibilitychange', pollTick);
+
+document.addEventListener('DOMContentLoaded', () => {
+    if (chartObserver) {
+        [dom.divergenceCanvas, dom.pnlCanvas, dom.efficiencyCanvas].forEach(c => chartObserver.observe(c));
+    }
+    if (panelObserver) {
+        document.querySelectorAll('[data-panel]').forEach(el => panelObserver.observe(el));
+    }
+
+    // Initial load
+    const now = Date.now();
+    pollTasks.forEach(task => { task.next = now + task.every; });
+    loadLatest();
+    loadHistory(24);
+    loadPositions();  // Load positions on startup
+
+    setInterval(pollTick, POLL_TICK_MS);
+});
+"""
+DASHBOARD_JS_BYTES = DASHBOARD_JS.encode()
+DASHBOARD_JS_URL = f"/static/dashboard.{hashlib.blake2b(DASHBOARD_JS_BYTES, digest_size=6).hexdigest()}.js"
+
+HTML_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <link rel="preconnect" href="https://cdn.jsdelivr.net">
+    <link rel="preload" as="fetch" href="/api/latest" crossorigin>
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>PNL Divergence Monitor</title>
+    <script src="https://cdn.jsdelivr.net/npm/chart.js" defer></script>
+    <script src="https://cdn.jsdelivr.net/npm/chartjs-adapter-date-fns" defer></script>
+    <link rel="stylesheet" href="__DASHBOARD_CSS_URL__">
 </head>
 <body>
     <div class="header">
@@ -828,21 +2519,21 @@ HTML_TEMPLATE = """
         <button onclick="loadHistory(168)" id="btn-168h">7D</button>
     </div>
 
-    <div class="chart-container">
+    <div class="chart-container" data-panel="charts">
         <h3>PNL vs Expected Over Time</h3>
         <div class="chart-wrapper">
             <canvas id="divergenceChart"></canvas>
         </div>
     </div>
 
-    <div class="chart-container">
+    <div class="chart-container" data-panel="charts">
         <h3>Rolling 24h PNL Comparison</h3>
         <div class="chart-wrapper">
             <canvas id="pnlChart"></canvas>
         </div>
     </div>
 
-    <div class="chart-container">
+    <div class="chart-container" data-panel="charts">
         <h3>Copy Efficiency Over Time</h3>
         <div class="chart-wrapper">
             <canvas id="efficiencyChart"></canvas>
@@ -850,7 +2541,7 @@ HTML_TEMPLATE = """
     </div>
 
     <!-- Position Fill Rate Comparison Section -->
-    <div class="section-header" style="margin: 40px 0 20px 0;">
+    <div class="section-header" data-panel="positions" style="margin: 40px 0 20px 0;">
         <h2 style="color: #fff; font-size: 22px; text-align: center;">Position Fill Rate Analysis</h2>
         <p style="color: #888; text-align: center; font-size: 14px;">Comparing actual position sizes vs expected (Whale × 8%)</p>
         <div style="text-align: center; margin-top: 15px;">
@@ -860,7 +2551,7 @@ HTML_TEMPLATE = """
         </div>
     </div>
 
-    <div class="grid" id="position-summary" style="margin-bottom: 20px;">
+    <div class="grid" data-panel="positions" id="position-summary" style="margin-bottom: 20px;">
         <div class="card">
             <h3>Matched Positions</h3>
             <div class="value" id="matched-positions">--</div>
@@ -883,7 +2574,7 @@ HTML_TEMPLATE = """
         </div>
     </div>
 
-    <div class="grid" style="grid-template-columns: repeat(4, 1fr); margin-bottom: 20px;">
+    <div class="grid" data-panel="positions" style="grid-template-columns: repeat(4, 1fr); margin-bottom: 20px;">
         <div class="card" style="border-left: 3px solid #4ade80;">
             <h3>On Target (±1%)</h3>
             <div class="value" id="on-target-count" style="font-size: 24px;">--</div>
@@ -902,23 +2593,23 @@ HTML_TEMPLATE = """
         </div>
     </div>
 
-    <div class="chart-container">
+    <div class="chart-container" data-panel="positions">
         <h3>Position Fill Rate Deviations <span id="positions-count" style="color: #888; font-size: 14px;"></span></h3>
-        <div style="height: 500px; overflow-y: auto;" id="positions-table">
+        <div style="height: 500px; overflow-y: auto; contain: strict;" id="positions-table">
             <table style="width: 100%; border-collapse: collapse; font-size: 13px;">
                 <thead style="position: sticky; top: 0; background: #1a1a1a; z-index: 10;">
                     <tr style="border-bottom: 1px solid #3a3a3a;">
                         <th style="text-align: left; padding: 10px; color: #888;">Market</th>
-                        <th style="text-align: right; padding: 10px; color: #888; cursor: pointer; user-select: none;" onclick="toggleSort('whale_size')" id="th-whale-size">
+                        <th class="sortable" onclick="toggleSort('whale_size')" id="th-whale-size">
                             Whale Size <span id="sort-whale-size">▼</span>
                         </th>
                         <th style="text-align: right; padding: 10px; color: #888;">Expected</th>
                         <th style="text-align: right; padding: 10px; color: #888;">Actual</th>
                         <th style="text-align: right; padding: 10px; color: #888;">Fill Rate</th>
-                        <th style="text-align: right; padding: 10px; color: #888; cursor: pointer; user-select: none;" onclick="toggleSort('deviation')" id="th-deviation">
+                        <th class="sortable" onclick="toggleSort('deviation')" id="th-deviation">
                             Deviation <span id="sort-deviation">▲</span>
                         </th>
-                        <th style="text-align: right; padding: 10px; color: #888; cursor: pointer; user-select: none;" onclick="toggleSort('pnl_impact')" id="th-pnl-impact">
+                        <th class="sortable" onclick="toggleSort('pnl_impact')" id="th-pnl-impact">
                             PNL Impact <span id="sort-pnl-impact">▼</span>
                         </th>
                     </tr>
@@ -931,13 +2622,13 @@ HTML_TEMPLATE = """
     </div>
 
     <!-- NEW: Performance Analysis Section -->
-    <div class="section-header" style="margin: 40px 0 20px 0;">
+    <div class="section-header" data-panel="positions" style="margin: 40px 0 20px 0;">
         <h2 style="color: #fff; font-size: 22px; text-align: center;">Performance Analysis</h2>
         <p style="color: #888; text-align: center; font-size: 14px;">Understanding why you underperform: PNL breakdown by fill status and position size</p>
     </div>
 
     <!-- PNL by Fill Status -->
-    <div class="chart-container" style="margin-bottom: 20px;">
+    <div class="chart-container" data-panel="positions" style="margin-bottom: 20px;">
         <h3>Whale PNL by Your Fill Status</h3>
         <p style="color: #888; font-size: 12px; margin-bottom: 15px;">Are you overfilling winners or losers?</p>
         <div id="pnl-by-fill-status">
@@ -960,7 +2651,7 @@ HTML_TEMPLATE = """
     </div>
 
     <!-- PNL by Size Bucket -->
-    <div class="chart-container" style="margin-bottom: 20px;">
+    <div class="chart-container" data-panel="positions" style="margin-bottom: 20px;">
         <h3>Whale PNL & Your Fill Rate by Position Size</h3>
         <p style="color: #888; font-size: 12px; margin-bottom: 15px;">Is the whale winning on large or small trades? What's your fill rate at each size?</p>
         <div style="max-height: 400px; overflow-y: auto;">
@@ -984,7 +2675,7 @@ HTML_TEMPLATE = """
     </div>
 
     <!-- Summary Insight -->
-    <div class="chart-container" style="margin-bottom: 20px;">
+    <div class="chart-container" data-panel="positions" style="margin-bottom: 20px;">
         <h3>Key Insight</h3>
         <div id="performance-insight" style="padding: 20px; background: #2a2a2a; border-radius: 8px; font-size: 14px; line-height: 1.6;">
             <p style="color: #888;">Loading analysis...</p>
@@ -999,690 +2690,70 @@ HTML_TEMPLATE = """
         <div>Last updated: <span id="last-update">--</span></div>
     </div>
 
-    <script>
-        let divergenceChart, pnlChart, efficiencyChart;
-        let currentHours = 24;
-
-        // Position data and sort state
-        let positionsData = [];
-        let sortConfig = {
-            primary: 'whale_size',      // 'whale_size', 'deviation', or 'pnl_impact'
-            whale_size_desc: true,      // true = descending (largest first)
-            deviation_asc: true,        // true = ascending (most negative first)
-            pnl_impact_desc: true       // true = descending (largest positive first)
-        };
-
-        function formatMoney(val, showSign = false) {
-            if (val === null || val === undefined) return '--';
-            const sign = showSign && val >= 0 ? '+' : '';
-            return sign + '$' + val.toLocaleString('en-US', {
-                minimumFractionDigits: 2,
-                maximumFractionDigits: 2
-            });
-        }
-
-        function formatPercent(val) {
-            if (val === null || val === undefined) return '--';
-            return val.toFixed(1) + '%';
-        }
-
-        function updateLatest(data) {
-            if (!data || !data.timestamp) return;
-
-            // Update PNL vs Expected
-            const pnlVsExpected = document.getElementById('pnl-vs-expected');
-            pnlVsExpected.textContent = formatMoney(data.pnl_vs_expected, true);
-            pnlVsExpected.className = 'value ' + (data.pnl_vs_expected >= 0 ? 'positive' : 'negative');
-
-            // Update Efficiency
-            const eff = data.pnl_efficiency;
-            document.getElementById('efficiency').textContent = formatPercent(eff);
-            const effBar = document.getElementById('efficiency-bar');
-            if (eff !== null) {
-                const width = Math.min(Math.max(eff, 0), 200);
-                effBar.style.width = (width / 2) + '%';
-                effBar.style.background = eff >= 100 ? '#4ade80' : '#f87171';
-            }
-
-            // Update Expected PNL
-            document.getElementById('expected-pnl').textContent = formatMoney(data.expected_pnl, true);
-
-            // Update Status
-            const status = document.getElementById('status');
-            const statusDetail = document.getElementById('status-detail');
-            if (data.pnl_vs_expected > 0) {
-                status.textContent = 'OUTPERFORM';
-                status.className = 'value positive';
-                statusDetail.textContent = 'Beating expected by ' + formatMoney(data.pnl_vs_expected);
-            } else if (data.pnl_vs_expected < 0) {
-                status.textContent = 'UNDERPERFORM';
-                status.className = 'value negative';
-                statusDetail.textContent = 'Behind expected by ' + formatMoney(-data.pnl_vs_expected);
-            } else {
-                status.textContent = 'TRACKING';
-                status.className = 'value';
-                statusDetail.textContent = 'On target';
-            }
-
-            // Update User 1
-            document.getElementById('user1-value').textContent = formatMoney(data.user1_value);
-            const u1pnl = document.getElementById('user1-pnl');
-            u1pnl.textContent = formatMoney(data.user1_pnl, true);
-            u1pnl.style.color = data.user1_pnl >= 0 ? '#4ade80' : '#f87171';
-
-            // Update User 2
-            document.getElementById('user2-value').textContent = formatMoney(data.user2_value);
-            const u2pnl = document.getElementById('user2-pnl');
-            u2pnl.textContent = formatMoney(data.user2_pnl, true);
-            u2pnl.style.color = data.user2_pnl >= 0 ? '#4ade80' : '#f87171';
-
-            // Update timestamp
-            const ts = new Date(data.timestamp);
-            document.getElementById('last-update').textContent = ts.toLocaleTimeString();
-        }
-
-        function updateCharts(snapshots, labels) {
-            const timestamps = snapshots.map(s => new Date(s.timestamp));
-
-            // PNL vs Expected chart
-            const divergenceData = snapshots.map(s => s.pnl_vs_expected);
-            if (divergenceChart) {
-                divergenceChart.data.labels = timestamps;
-                divergenceChart.data.datasets[0].data = divergenceData;
-                divergenceChart.update('none');
-            } else {
-                divergenceChart = new Chart(document.getElementById('divergenceChart'), {
-                    type: 'line',
-                    data: {
-                        labels: timestamps,
-                        datasets: [{
-                            label: 'PNL vs Expected',
-                            data: divergenceData,
-                            borderColor: '#4ade80',
-                            backgroundColor: 'rgba(74, 222, 128, 0.1)',
-                            fill: true,
-                            tension: 0.3,
-                            pointRadius: 0,
-                        }]
-                    },
-                    options: {
-                        responsive: true,
-                        maintainAspectRatio: false,
-                        plugins: { legend: { display: false } },
-                        scales: {
-                            x: {
-                                type: 'time',
-                                grid: { color: '#2a2a2a' },
-                                ticks: { color: '#888' }
-                            },
-                            y: {
-                                grid: { color: '#2a2a2a' },
-                                ticks: {
-                                    color: '#888',
-                                    callback: v => '$' + v.toLocaleString()
-                                }
-                            }
-                        }
-                    }
-                });
-            }
-
-            // PNL Comparison chart
-            const user1Pnl = snapshots.map(s => s.user1_pnl);
-            const user2Pnl = snapshots.map(s => s.user2_pnl);
-            const expectedPnl = snapshots.map(s => s.expected_pnl);
-
-            if (pnlChart) {
-                pnlChart.data.labels = timestamps;
-                pnlChart.data.datasets[0].data = user1Pnl;
-                pnlChart.data.datasets[1].data = expectedPnl;
-                pnlChart.data.datasets[2].data = user2Pnl;
-                pnlChart.update('none');
-            } else {
-                pnlChart = new Chart(document.getElementById('pnlChart'), {
-                    type: 'line',
-                    data: {
-                        labels: timestamps,
-                        datasets: [
-                            {
-                                label: labels.user1_label + ' (Actual)',
-                                data: user1Pnl,
-                                borderColor: '#60a5fa',
-                                tension: 0.3,
-                                pointRadius: 0,
-                            },
-                            {
-                                label: 'Expected (' + (labels.scaling_ratio * 100) + '%)',
-                                data: expectedPnl,
-                                borderColor: '#a78bfa',
-                                borderDash: [5, 5],
-                                tension: 0.3,
-                                pointRadius: 0,
-                            },
-                            {
-                                label: labels.user2_label + ' (Whale)',
-                                data: user2Pnl,
-                                borderColor: '#fbbf24',
-                                tension: 0.3,
-                                pointRadius: 0,
-                            }
-                        ]
-                    },
-                    options: {
-                        responsive: true,
-                        maintainAspectRatio: false,
-                        plugins: {
-                            legend: {
-                                labels: { color: '#888' }
-                            }
-                        },
-                        scales: {
-                            x: {
-                                type: 'time',
-                                grid: { color: '#2a2a2a' },
-                                ticks: { color: '#888' }
-                            },
-                            y: {
-                                grid: { color: '#2a2a2a' },
-                                ticks: {
-                                    color: '#888',
-                                    callback: v => '$' + v.toLocaleString()
-                                }
-                            }
-                        }
-                    }
-                });
-            }
-
-            // Efficiency chart
-            const efficiencyData = snapshots.map(s => s.pnl_efficiency);
-            if (efficiencyChart) {
-                efficiencyChart.data.labels = timestamps;
-                efficiencyChart.data.datasets[0].data = efficiencyData;
-                efficiencyChart.update('none');
-            } else {
-                efficiencyChart = new Chart(document.getElementById('efficiencyChart'), {
-                    type: 'line',
-                    data: {
-                        labels: timestamps,
-                        datasets: [{
-                            label: 'Copy Efficiency %',
-                            data: efficiencyData,
-                            borderColor: '#f472b6',
-                            tension: 0.3,
-                            pointRadius: 0,
-                        }]
-                    },
-                    options: {
-                        responsive: true,
-                        maintainAspectRatio: false,
-                        plugins: { legend: { display: false } },
-                        scales: {
-                            x: {
-                                type: 'time',
-                                grid: { color: '#2a2a2a' },
-                                ticks: { color: '#888' }
-                            },
-                            y: {
-                                grid: { color: '#2a2a2a' },
-                                ticks: {
-                                    color: '#888',
-                                    callback: v => v.toFixed(0) + '%'
-                                }
-                            }
-                        },
-                        annotations: {
-                            line1: {
-                                type: 'line',
-                                yMin: 100,
-                                yMax: 100,
-                                borderColor: '#4ade80',
-                                borderDash: [5, 5],
-                            }
-                        }
-                    }
-                });
-            }
-        }
-
-        async function loadHistory(hours) {
-            currentHours = hours;
-
-            // Update button states
-            document.querySelectorAll('.time-selector button').forEach(btn => {
-                btn.classList.remove('active');
-            });
-            document.getElementById('btn-' + hours + 'h').classList.add('active');
-
-            try {
-                const resp = await fetch('/api/history?hours=' + hours);
-                const data = await resp.json();
-
-                if (data.snapshots && data.snapshots.length > 0) {
-                    updateCharts(data.snapshots, data);
-
-                    // Update labels if provided
-                    if (data.user1_label) {
-                        document.getElementById('user1-label').textContent = data.user1_label;
-                    }
-                    if (data.user2_label) {
-                        document.getElementById('user2-label').textContent = data.user2_label;
-                    }
-                    if (data.scaling_ratio) {
-                        document.getElementById('scaling-ratio').textContent = (data.scaling_ratio * 100) + '%';
-                    }
-                }
-            } catch (e) {
-                console.error('Error loading history:', e);
-            }
-        }
-
-        async function loadLatest() {
-            try {
-                const resp = await fetch('/api/latest');
-                const data = await resp.json();
-                updateLatest(data);
-            } catch (e) {
-                console.error('Error loading latest:', e);
-            }
-        }
-
-        // Position comparison functions
-        function toggleSort(column) {
-            if (column === 'whale_size') {
-                if (sortConfig.primary === 'whale_size') {
-                    // Toggle direction
-                    sortConfig.whale_size_desc = !sortConfig.whale_size_desc;
-                } else {
-                    // Switch to whale_size as primary
-                    sortConfig.primary = 'whale_size';
-                }
-            } else if (column === 'deviation') {
-                if (sortConfig.primary === 'deviation') {
-                    // Toggle direction
-                    sortConfig.deviation_asc = !sortConfig.deviation_asc;
-                } else {
-                    // Switch to deviation as primary
-                    sortConfig.primary = 'deviation';
-                }
-            } else if (column === 'pnl_impact') {
-                if (sortConfig.primary === 'pnl_impact') {
-                    // Toggle direction
-                    sortConfig.pnl_impact_desc = !sortConfig.pnl_impact_desc;
-                } else {
-                    // Switch to pnl_impact as primary
-                    sortConfig.primary = 'pnl_impact';
-                }
-            }
-            updateSortIndicators();
-            renderPositionsTable();
-        }
-
-        function updateSortIndicators() {
-            const whaleEl = document.getElementById('sort-whale-size');
-            const devEl = document.getElementById('sort-deviation');
-            const pnlEl = document.getElementById('sort-pnl-impact');
-            const whaleThEl = document.getElementById('th-whale-size');
-            const devThEl = document.getElementById('th-deviation');
-            const pnlThEl = document.getElementById('th-pnl-impact');
-
-            // Reset styles
-            whaleThEl.style.color = '#888';
-            devThEl.style.color = '#888';
-            pnlThEl.style.color = '#888';
-
-            // Update arrows based on current direction settings
-            whaleEl.textContent = sortConfig.whale_size_desc ? '▼' : '▲';
-            devEl.textContent = sortConfig.deviation_asc ? '▲' : '▼';
-            pnlEl.textContent = sortConfig.pnl_impact_desc ? '▼' : '▲';
-
-            // Highlight the active sort column
-            if (sortConfig.primary === 'whale_size') {
-                whaleThEl.style.color = '#4ade80';
-            } else if (sortConfig.primary === 'deviation') {
-                devThEl.style.color = '#4ade80';
-            } else if (sortConfig.primary === 'pnl_impact') {
-                pnlThEl.style.color = '#4ade80';
-            }
-        }
-
-        function sortPositions(comparisons) {
-            return [...comparisons].sort((a, b) => {
-                if (sortConfig.primary === 'whale_size') {
-                    // Primary: whale size
-                    const whaleA = a.whale.size;
-                    const whaleB = b.whale.size;
-                    if (whaleA !== whaleB) {
-                        return sortConfig.whale_size_desc ? (whaleB - whaleA) : (whaleA - whaleB);
-                    }
-                    // Secondary: deviation
-                    return sortConfig.deviation_asc ? (a.fill_rate_deviation - b.fill_rate_deviation) : (b.fill_rate_deviation - a.fill_rate_deviation);
-                } else if (sortConfig.primary === 'deviation') {
-                    // Primary: deviation
-                    const devA = a.fill_rate_deviation;
-                    const devB = b.fill_rate_deviation;
-                    if (devA !== devB) {
-                        return sortConfig.deviation_asc ? (devA - devB) : (devB - devA);
-                    }
-                    // Secondary: whale size
-                    return sortConfig.whale_size_desc ? (b.whale.size - a.whale.size) : (a.whale.size - b.whale.size);
-                } else if (sortConfig.primary === 'pnl_impact') {
-                    // Primary: pnl impact
-                    const pnlA = a.deviation_pnl_impact;
-                    const pnlB = b.deviation_pnl_impact;
-                    if (pnlA !== pnlB) {
-                        return sortConfig.pnl_impact_desc ? (pnlB - pnlA) : (pnlA - pnlB);
-                    }
-                    // Secondary: whale size
-                    return sortConfig.whale_size_desc ? (b.whale.size - a.whale.size) : (a.whale.size - b.whale.size);
-                }
-            });
-        }
-
-        function renderPositionsTable() {
-            const tbody = document.getElementById('positions-tbody');
-
-            if (positionsData.length === 0) {
-                tbody.innerHTML = '<tr><td colspan="7" style="text-align: center; padding: 40px; color: #666;">No positions found</td></tr>';
-                return;
-            }
-
-            const sorted = sortPositions(positionsData);
-            let html = '';
-
-            for (const c of sorted) {
-                const fillRatePct = (c.fill_rate * 100).toFixed(2);
-                const deviationPct = (c.fill_rate_deviation * 100).toFixed(2);
-                const devColor = c.fill_rate_deviation > 0.01 ? '#60a5fa' :
-                                 c.fill_rate_deviation < -0.01 ? (c.has_position ? '#fbbf24' : '#f87171') :
-                                 '#4ade80';
-
-                const statusIcon = !c.has_position ? '❌' :
-                                   c.fill_rate_deviation > 0.01 ? '📈' :
-                                   c.fill_rate_deviation < -0.01 ? '📉' : '✅';
-
-                const pnlColor = c.deviation_pnl_impact >= 0 ? '#4ade80' : '#f87171';
-
-                // Truncate title
-                const title = c.title.length > 50 ? c.title.substring(0, 47) + '...' : c.title;
-                const polymarketUrl = c.slug ? 'https://polymarket.com/event/' + c.slug : '#';
-
-                html += '<tr style="border-bottom: 1px solid #2a2a2a;">' +
-                    '<td style="padding: 10px; max-width: 300px;">' +
-                        '<a href="' + polymarketUrl + '" target="_blank" style="color: #60a5fa; text-decoration: none;">' +
-                            statusIcon + ' ' + title +
-                        '</a>' +
-                        '<div style="color: #666; font-size: 11px;">' + c.outcome + '</div>' +
-                    '</td>' +
-                    '<td style="text-align: right; padding: 10px;">' + c.whale.size.toLocaleString(undefined, {maximumFractionDigits: 0}) + '</td>' +
-                    '<td style="text-align: right; padding: 10px;">' + c.expected_size.toLocaleString(undefined, {maximumFractionDigits: 0}) + '</td>' +
-                    '<td style="text-align: right; padding: 10px;">' + c.actual_size.toLocaleString(undefined, {maximumFractionDigits: 0}) + '</td>' +
-                    '<td style="text-align: right; padding: 10px;">' + fillRatePct + '%</td>' +
-                    '<td style="text-align: right; padding: 10px; color: ' + devColor + ';">' + (c.fill_rate_deviation >= 0 ? '+' : '') + deviationPct + '%</td>' +
-                    '<td style="text-align: right; padding: 10px; color: ' + pnlColor + ';">' + formatMoney(c.deviation_pnl_impact, true) + '</td>' +
-                '</tr>';
-            }
-            tbody.innerHTML = html;
-        }
-
-        async function loadPositions() {
-            const tbody = document.getElementById('positions-tbody');
-            tbody.innerHTML = '<tr><td colspan="7" style="text-align: center; padding: 40px; color: #888;">Loading positions...</td></tr>';
-
-            try {
-                const resp = await fetch('/api/positions');
-                const data = await resp.json();
-
-                if (data.error) {
-                    tbody.innerHTML = '<tr><td colspan="7" style="text-align: center; padding: 40px; color: #f87171;">Error: ' + data.error + '</td></tr>';
-                    return;
-                }
-
-                // Update summary
-                const s = data.summary;
-                document.getElementById('matched-positions').textContent = s.matched_positions + ' / ' + s.whale_positions;
-                document.getElementById('avg-fill-rate').textContent = (s.avg_fill_rate * 100).toFixed(2) + '%';
-                document.getElementById('expected-fill-rate').textContent = (s.expected_fill_rate * 100) + '%';
-
-                const fillEff = document.getElementById('fill-efficiency');
-                fillEff.textContent = s.fill_rate_efficiency.toFixed(1) + '%';
-                fillEff.className = 'value ' + (s.fill_rate_efficiency >= 100 ? 'positive' : 'negative');
-
-                const devPnl = document.getElementById('deviation-pnl');
-                devPnl.textContent = formatMoney(s.total_deviation_pnl, true);
-                devPnl.className = 'value ' + (s.total_deviation_pnl >= 0 ? 'positive' : 'negative');
-
-                document.getElementById('on-target-count').textContent = s.on_target_count;
-                document.getElementById('overfilled-count').textContent = s.overfilled_count;
-                document.getElementById('underfilled-count').textContent = s.underfilled_count;
-                document.getElementById('missed-count').textContent = s.missed_count;
-
-                // Store all positions (no limit)
-                positionsData = data.comparisons;
-                document.getElementById('positions-count').textContent = '(' + positionsData.length + ' positions)';
-
-                // Update sort indicators and render
-                updateSortIndicators();
-                renderPositionsTable();
-
-                // Render new Performance Analysis tables
-                renderFillStatusTable(data.pnl_by_fill_status);
-                renderSizeBucketTable(data.size_bucket_analysis);
-                renderPerformanceInsight(data);
-
-            } catch (e) {
-                console.error('Error loading positions:', e);
-                tbody.innerHTML = '<tr><td colspan="7" style="text-align: center; padding: 40px; color: #f87171;">Error loading positions</td></tr>';
-            }
-        }
-
-        function renderFillStatusTable(pnlByFillStatus) {
-            const tbody = document.getElementById('fill-status-tbody');
-            if (!pnlByFillStatus) {
-                tbody.innerHTML = '<tr><td colspan="6" style="text-align: center; padding: 20px; color: #666;">No data</td></tr>';
-                return;
-            }
-
-            const statusConfig = {
-                'overfilled': { label: 'Overfilled (>1% over)', color: '#60a5fa', icon: '📈' },
-                'underfilled': { label: 'Underfilled (<1% under)', color: '#fbbf24', icon: '📉' },
-                'on_target': { label: 'On Target (±1%)', color: '#4ade80', icon: '✅' },
-                'missed': { label: 'Missed Entirely', color: '#f87171', icon: '❌' },
-            };
-
-            let html = '';
-            for (const [status, stats] of Object.entries(pnlByFillStatus)) {
-                const cfg = statusConfig[status] || { label: status, color: '#888', icon: '?' };
-                const whalePnlColor = stats.whale_pnl >= 0 ? '#4ade80' : '#f87171';
-                const copierPnlColor = stats.copier_pnl >= 0 ? '#4ade80' : '#f87171';
-
-                // Determine verdict
-                let verdict = '';
-                let verdictColor = '#888';
-                if (status === 'overfilled') {
-                    if (stats.whale_pnl > 0) {
-                        verdict = 'GOOD - Overfilled winners';
-                        verdictColor = '#4ade80';
-                    } else if (stats.whale_pnl < 0) {
-                        verdict = 'BAD - Overfilled losers';
-                        verdictColor = '#f87171';
-                    }
-                } else if (status === 'underfilled') {
-                    if (stats.whale_pnl > 0) {
-                        verdict = 'BAD - Underfilled winners';
-                        verdictColor = '#f87171';
-                    } else if (stats.whale_pnl < 0) {
-                        verdict = 'GOOD - Underfilled losers';
-                        verdictColor = '#4ade80';
-                    }
-                } else if (status === 'missed') {
-                    if (stats.whale_pnl > 0) {
-                        verdict = 'BAD - Missed winners';
-                        verdictColor = '#f87171';
-                    } else if (stats.whale_pnl < 0) {
-                        verdict = 'GOOD - Dodged losers';
-                        verdictColor = '#4ade80';
-                    }
-                } else {
-                    verdict = 'Neutral';
-                }
-
-                html += '<tr style="border-bottom: 1px solid #2a2a2a;">' +
-                    '<td style="padding: 10px; color: ' + cfg.color + ';">' + cfg.icon + ' ' + cfg.label + '</td>' +
-                    '<td style="text-align: right; padding: 10px;">' + stats.count + '</td>' +
-                    '<td style="text-align: right; padding: 10px; color: ' + whalePnlColor + ';">' + formatMoney(stats.whale_pnl, true) + '</td>' +
-                    '<td style="text-align: right; padding: 10px; color: ' + whalePnlColor + ';">' + formatMoney(stats.avg_whale_pnl, true) + '</td>' +
-                    '<td style="text-align: right; padding: 10px; color: ' + copierPnlColor + ';">' + formatMoney(stats.copier_pnl, true) + '</td>' +
-                    '<td style="text-align: right; padding: 10px; color: ' + verdictColor + '; font-weight: 600;">' + verdict + '</td>' +
-                '</tr>';
-            }
-            tbody.innerHTML = html;
-        }
-
-        function renderSizeBucketTable(sizeBucketAnalysis) {
-            const tbody = document.getElementById('size-bucket-tbody');
-            if (!sizeBucketAnalysis || sizeBucketAnalysis.length === 0) {
-                tbody.innerHTML = '<tr><td colspan="7" style="text-align: center; padding: 20px; color: #666;">No data</td></tr>';
-                return;
-            }
-
-            let html = '';
-            for (const bucket of sizeBucketAnalysis) {
-                const whalePnlColor = bucket.whale_pnl >= 0 ? '#4ade80' : '#f87171';
-                const winRateColor = bucket.whale_win_rate >= 50 ? '#4ade80' : '#f87171';
-                const fillRatePct = (bucket.avg_fill_rate * 100).toFixed(2);
-                const vsTargetPct = bucket.fill_rate_vs_target.toFixed(0);
-                const vsTargetColor = bucket.fill_rate_vs_target >= 100 ? '#60a5fa' : '#fbbf24';
-
-                // Impact analysis: are you overfilling winners or losers?
-                let impact = '';
-                let impactColor = '#888';
-                const isOverfilling = bucket.fill_rate_vs_target > 105;
-                const isUnderfilling = bucket.fill_rate_vs_target < 95;
-                const isWinning = bucket.whale_pnl > 0;
-
-                if (isOverfilling && isWinning) {
-                    impact = 'GOOD';
-                    impactColor = '#4ade80';
-                } else if (isOverfilling && !isWinning) {
-                    impact = 'BAD';
-                    impactColor = '#f87171';
-                } else if (isUnderfilling && isWinning) {
-                    impact = 'BAD';
-                    impactColor = '#f87171';
-                } else if (isUnderfilling && !isWinning) {
-                    impact = 'GOOD';
-                    impactColor = '#4ade80';
-                } else {
-                    impact = 'OK';
-                }
-
-                html += '<tr style="border-bottom: 1px solid #2a2a2a;">' +
-                    '<td style="padding: 10px; font-weight: 600;">' + bucket.label + '</td>' +
-                    '<td style="text-align: right; padding: 10px;">' + bucket.count + '</td>' +
-                    '<td style="text-align: right; padding: 10px; color: ' + whalePnlColor + ';">' + formatMoney(bucket.whale_pnl, true) + '</td>' +
-                    '<td style="text-align: right; padding: 10px; color: ' + winRateColor + ';">' + bucket.whale_win_rate.toFixed(0) + '%</td>' +
-                    '<td style="text-align: right; padding: 10px;">' + fillRatePct + '%</td>' +
-                    '<td style="text-align: right; padding: 10px; color: ' + vsTargetColor + ';">' + vsTargetPct + '%</td>' +
-                    '<td style="text-align: right; padding: 10px; color: ' + impactColor + '; font-weight: 600;">' + impact + '</td>' +
-                '</tr>';
-            }
-            tbody.innerHTML = html;
-        }
-
-        function renderPerformanceInsight(data) {
-            const container = document.getElementById('performance-insight');
-            if (!data || !data.pnl_by_fill_status || !data.size_bucket_analysis) {
-                container.innerHTML = '<p style="color: #888;">No data available for analysis</p>';
-                return;
-            }
-
-            const fs = data.pnl_by_fill_status;
-            const buckets = data.size_bucket_analysis;
-
-            // Calculate key metrics
-            const overfillWhalePnl = fs.overfilled?.whale_pnl || 0;
-            const underfillWhalePnl = fs.underfilled?.whale_pnl || 0;
-            const missedWhalePnl = fs.missed?.whale_pnl || 0;
+    <script src="__DASHBOARD_JS_URL__" defer></script>
+</body>
+</html>
+"""
 
-            // Find large vs small bucket performance
-            const largeBuckets = buckets.filter(b => b.label.includes('k') && !b.label.startsWith('0'));
-            const smallBuckets = buckets.filter(b => b.label.startsWith('0') || b.label === '500-1k');
 
-            const largePnl = largeBuckets.reduce((sum, b) => sum + b.whale_pnl, 0);
-            const smallPnl = smallBuckets.reduce((sum, b) => sum + b.whale_pnl, 0);
+HTML_TEMPLATE = (HTML_TEMPLATE.replace('__DASHBOARD_CSS_URL__', DASHBOARD_CSS_URL)
+                 .replace('__DASHBOARD_JS_URL__', DASHBOARD_JS_URL))
 
-            const largeAvgFillVsTarget = largeBuckets.length > 0 ?
-                largeBuckets.reduce((sum, b) => sum + b.fill_rate_vs_target, 0) / largeBuckets.length : 100;
-            const smallAvgFillVsTarget = smallBuckets.length > 0 ?
-                smallBuckets.reduce((sum, b) => sum + b.fill_rate_vs_target, 0) / smallBuckets.length : 100;
+# Served as two chunks: everything through </head>, then the body
+_HEAD_END = HTML_TEMPLATE.index('</head>') + len('</head>')
+HEAD_CHUNK = HTML_TEMPLATE[:_HEAD_END].encode()
+BODY_CHUNK = HTML_TEMPLATE[_HEAD_END:].encode()
+INDEX_HASH = hashlib.blake2b(HEAD_CHUNK + BODY_CHUNK, digest_size=8).hexdigest()
 
-            // Build insight
-            let insights = [];
 
-            // Pattern 1: Overfilling losers
-            if (overfillWhalePnl < -50) {
-                insights.push('<span style="color: #f87171;">You are OVERFILLING positions where the whale is LOSING.</span> This magnifies your losses beyond the expected 8%.');
-            } else if (overfillWhalePnl > 50) {
-                insights.push('<span style="color: #4ade80;">You are OVERFILLING positions where the whale is WINNING.</span> This helps your performance.');
-            }
+def _precompress_index() -> Dict[Optional[str], tuple]:
+    """Compress the page once per encoding, flushing after <head> so it can still stream early."""
+    gz = zlib.compressobj(9, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    variants = {
+        None: (HEAD_CHUNK, BODY_CHUNK),
+        'gzip': (gz.compress(HEAD_CHUNK) + gz.flush(zlib.Z_SYNC_FLUSH),
+                 gz.compress(BODY_CHUNK) + gz.flush()),
+    }
+    if brotli is not None:
+        br = brotli.Compressor(quality=11)
+        variants['br'] = (br.process(HEAD_CHUNK) + br.flush(), br.process(BODY_CHUNK) + br.finish())
+    return variants
 
-            // Pattern 2: Underfilling winners
-            if (underfillWhalePnl > 100) {
-                insights.push('<span style="color: #f87171;">You are UNDERFILLING positions where the whale is WINNING.</span> You are missing out on gains.');
-            } else if (underfillWhalePnl < -100) {
-                insights.push('<span style="color: #4ade80;">You are UNDERFILLING positions where the whale is LOSING.</span> This protects you from losses.');
-            }
 
-            // Pattern 3: Large vs small trade analysis
-            if (largePnl < -100 && largeAvgFillVsTarget > 100) {
-                insights.push('<span style="color: #f87171;">CRITICAL: Large trades (1k+ shares) are LOSING and you are filling MORE than 8% on them.</span> Your aggressive execution on big trades is hurting you because the whale loses on these.');
-            } else if (largePnl > 100 && largeAvgFillVsTarget > 100) {
-                insights.push('<span style="color: #4ade80;">Large trades are WINNING and you are filling more - this is working in your favor.</span>');
-            }
+INDEX_VARIANTS = _precompress_index()
+# One ETag per encoding: the variants are different byte streams (Vary: Accept-Encoding)
+INDEX_ETAGS = {enc: f'"{INDEX_HASH}-{enc or "identity"}"' for enc in INDEX_VARIANTS}
 
-            if (smallPnl > 100 && smallAvgFillVsTarget < 100) {
-                insights.push('<span style="color: #f87171;">Small trades (under 1k shares) are WINNING but you are filling LESS than 8%.</span> You are missing gains on the whale\\'s winning small trades.');
-            } else if (smallPnl < -100 && smallAvgFillVsTarget < 100) {
-                insights.push('<span style="color: #4ade80;">Small trades are LOSING and you fill less - this is protecting you.</span>');
-            }
 
-            // Summary
-            let summary = '';
-            if (largePnl < 0 && largeAvgFillVsTarget > 100) {
-                summary = '<div style="margin-top: 15px; padding: 15px; background: #3a1a1a; border-radius: 6px; border-left: 3px solid #f87171;">' +
-                    '<strong style="color: #f87171;">ROOT CAUSE IDENTIFIED:</strong> The whale is losing on large positions, and your aggressive execution (higher buffers, IOC orders) causes you to fill MORE on these large losers. ' +
-                    'Meanwhile, you fill less on small trades where the whale may be winning. This creates systematic underperformance.' +
-                    '</div>';
-            } else if (insights.length === 0) {
-                summary = '<p style="color: #888;">Fill patterns appear balanced. Performance divergence may be due to timing differences or market conditions.</p>';
-            }
+def _compress_variants(data: bytes) -> Dict[Optional[str], bytes]:
+    """`data` compressed once per supported Content-Encoding (None = identity)."""
+    gz = zlib.compressobj(9, zlib.DEFLATED, 31)
+    variants = {None: data, 'gzip': gz.compress(data) + gz.flush()}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    return variants
 
-            container.innerHTML = (insights.length > 0 ? '<ul style="margin: 0; padding-left: 20px;">' + insights.map(i => '<li style="margin-bottom: 10px;">' + i + '</li>').join('') + '</ul>' : '') + summary;
-        }
 
-        // Initial load
-        loadLatest();
-        loadHistory(24);
-        loadPositions();  // Load positions on startup
-
-        // Auto-refresh every 30 seconds
-        setInterval(loadLatest, 30000);
-        setInterval(() => loadHistory(currentHours), 60000);
-        // Refresh positions every 5 minutes
-        setInterval(loadPositions, 300000);
-    </script>
-</body>
-</html>
-"""
+# Content-hashed dashboard assets: URL -> (content type, encoded variants)
+STATIC_ASSETS = {
+    DASHBOARD_CSS_URL: ('text/css', _compress_variants(DASHBOARD_CSS_BYTES)),
+    DASHBOARD_JS_URL: ('application/javascript', _compress_variants(DASHBOARD_JS_BYTES)),
+}
 
 
 # =============================================================================
 # MAIN
 # =============================================================================
+async def on_cleanup(app):
+    """Release the shared HTTP session and database connection on shutdown."""
+    await close_session()
+    await asyncio.to_thread(close_db)
+
+
 async def main():
     # Initialize database
     init_db()
+    load_positions_cache()
 
     # Start background fetcher
     asyncio.create_task(background_fetcher())
@@ -1690,10 +2761,13 @@ async def main():
     # Setup web server
     app = web.Application()
     app.router.add_get('/', handle_index)
+    for url in STATIC_ASSETS:
+        app.router.add_get(url, handle_static_asset)
     app.router.add_get('/api/latest', handle_api_latest)
     app.router.add_get('/api/history', handle_api_history)
     app.router.add_get('/api/config', handle_api_config)
     app.router.add_get('/api/positions', handle_api_positions)
+    app.on_cleanup.append(on_cleanup)
 
     runner = web.AppRunner(app)
     await runner.setup()
@@ -1704,8 +2778,11 @@ async def main():
     logger.info(f"Monitoring {USER_1_LABEL} vs {USER_2_LABEL} (scaling ratio: {SCALING_RATIO:.0%})")
 
     # Keep running
-    while True:
-        await asyncio.sleep(3600)
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await runner.cleanup()
 
 
 if __name__ == '__main__':
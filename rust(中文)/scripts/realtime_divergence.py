@@ -26,13 +26,29 @@ Usage:
 
 import argparse
 import asyncio
+import random
+import statistics
 import sys
+import time
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, List
+from operator import attrgetter
+from typing import Optional, Deque, Dict, Tuple
 import json
 
 import aiohttp
+from yarl import URL
+
+try:
+    import orjson  # optional, faster history serialization
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np  # optional, vectorizes the ASCII chart
+except ImportError:
+    np = None
 
 # =============================================================================
 # CONFIGURATION
@@ -47,9 +63,20 @@ USER_2_LABEL = "swisstony"
 # pub const SCALING_RATIO: f64 = 0.08;
 SCALING_RATIO = 0.08  # 8% - User 1 copies User 2 at this ratio
 
+DEFAULT_MAX_HISTORY = 10_000  # snapshots kept in memory when running without --duration
+
 DATA_API_BASE = "https://data-api.polymarket.com"
 USER_PNL_API = "https://user-pnl-api.polymarket.com/user-pnl"
 
+# Sent on every request of the tracker's shared keep-alive session. Accept-Encoding
+# is left to aiohttp, which already offers gzip/deflate (and br with brotli installed)
+REQUEST_HEADERS = {"Accept": "application/json"}
+
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF_BASE = 0.2  # seconds, doubled per attempt
+RETRY_BACKOFF_MAX = 2.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
 
 @dataclass
 class UserSnapshot:
@@ -64,165 +91,277 @@ class UserSnapshot:
     error: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class DivergenceSnapshot:
-    """Divergence between two users at a point in time."""
+    """Divergence between two users at a point in time.
+
+    Derived metrics are computed once in __post_init__ rather than on every
+    access, since the printers and save_history read them repeatedly.
+    """
     timestamp: datetime
     user1: UserSnapshot
     user2: UserSnapshot
     scaling_ratio: float = SCALING_RATIO
 
     # === RAW DIFFERENCES ===
+    value_divergence: Optional[float] = field(default=None, init=False)  # user1 - user2 portfolio value
+    pnl_divergence: Optional[float] = field(default=None, init=False)    # user1 - user2 day PNL
+    value_ratio: Optional[float] = field(default=None, init=False)       # user1 / user2 portfolio value
 
-    @property
-    def value_divergence(self) -> Optional[float]:
-        """Absolute difference in portfolio value."""
-        if self.user1.portfolio_value is not None and self.user2.portfolio_value is not None:
-            return self.user1.portfolio_value - self.user2.portfolio_value
-        return None
+    # === EXPECTED VALUES (based on SCALING_RATIO) ===
+    expected_pnl: Optional[float] = field(default=None, init=False)      # user2 PNL * SCALING_RATIO
+    pnl_vs_expected: Optional[float] = field(default=None, init=False)   # + outperforming, - underperforming
+    pnl_vs_expected_pct: Optional[float] = field(default=None, init=False)
+    actual_pnl_ratio: Optional[float] = field(default=None, init=False)  # user1 PNL / user2 PNL
+    # How well we track the whale's PNL at our target ratio:
+    # 100% = perfect, >100% = outperforming, <100% = underperforming
+    pnl_ratio_efficiency: Optional[float] = field(default=None, init=False)
+
+    def __post_init__(self):
+        v1, v2 = self.user1.portfolio_value, self.user2.portfolio_value
+        p1, p2 = self.user1.day_pnl, self.user2.day_pnl
+
+        if v1 is not None and v2 is not None:
+            self.value_divergence = v1 - v2
+            if v2 > 0:
+                self.value_ratio = v1 / v2
+
+        if p1 is not None and p2 is not None:
+            self.pnl_divergence = p1 - p2
+            if p2 != 0:
+                self.actual_pnl_ratio = p1 / p2
+                if self.scaling_ratio != 0:
+                    self.pnl_ratio_efficiency = (self.actual_pnl_ratio / self.scaling_ratio) * 100
+
+        if p2 is not None:
+            self.expected_pnl = p2 * self.scaling_ratio
+            if p1 is not None:
+                self.pnl_vs_expected = p1 - self.expected_pnl
+                if self.expected_pnl != 0:
+                    self.pnl_vs_expected_pct = (self.pnl_vs_expected / abs(self.expected_pnl)) * 100
+
+
+async def get_json_with_retry(session: aiohttp.ClientSession, url: URL,
+                              params: Optional[dict] = None):
+    """
+    GET `url` and decode the JSON body, retrying transient failures
+    (connection errors, timeouts, 429/5xx) with jittered exponential backoff.
+    Returns None for other non-200 responses; re-raises the last error.
+    """
+    for attempt in range(RETRY_ATTEMPTS):
+        last_attempt = attempt == RETRY_ATTEMPTS - 1
+        retry_after = ""
+        try:
+            async with session.get(url, params=params) as resp:
+                if resp.status == 200:
+                    return await resp.json()
+                if resp.status not in RETRY_STATUSES or last_attempt:
+                    return None
+                retry_after = resp.headers.get("Retry-After", "")
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if last_attempt:
+                raise
+        if retry_after.isdigit():
+            delay = min(float(retry_after), RETRY_BACKOFF_MAX)
+        else:
+            delay = random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt))
+        await asyncio.sleep(delay)
+    return None
 
-    @property
-    def pnl_divergence(self) -> Optional[float]:
-        """Difference in day PNL."""
-        if self.user1.day_pnl is not None and self.user2.day_pnl is not None:
-            return self.user1.day_pnl - self.user2.day_pnl
-        return None
 
-    @property
-    def value_ratio(self) -> Optional[float]:
-        """Ratio of user1 value to user2 value."""
-        if (self.user1.portfolio_value is not None and
-            self.user2.portfolio_value is not None and
-            self.user2.portfolio_value > 0):
-            return self.user1.portfolio_value / self.user2.portfolio_value
+def summarize_series(values: list) -> Optional[dict]:
+    """min/max/mean/std (population) and 5th/50th/95th percentiles of a series."""
+    if not values:
         return None
+    if np is not None:
+        arr = np.fromiter(values, dtype=np.float64, count=len(values))
+        p5, p50, p95 = np.percentile(arr, [5, 50, 95])
+        return {
+            "count": arr.size, "min": arr.min(), "max": arr.max(),
+            "mean": arr.mean(), "std": arr.std(), "p5": p5, "p50": p50, "p95": p95,
+        }
+    if len(values) > 1:
+        cuts = statistics.quantiles(values, n=20, method="inclusive")
+        p5, p50, p95 = cuts[0], cuts[9], cuts[18]
+    else:
+        p5 = p50 = p95 = values[0]
+    return {
+        "count": len(values), "min": min(values), "max": max(values),
+        "mean": statistics.fmean(values), "std": statistics.pstdev(values),
+        "p5": p5, "p50": p50, "p95": p95,
+    }
 
-    # === EXPECTED VALUES (based on SCALING_RATIO) ===
-
-    @property
-    def expected_pnl(self) -> Optional[float]:
-        """Expected User1 PNL = User2 PNL * SCALING_RATIO."""
-        if self.user2.day_pnl is not None:
-            return self.user2.day_pnl * self.scaling_ratio
-        return None
 
-    @property
-    def pnl_vs_expected(self) -> Optional[float]:
-        """
-        Divergence from expected PNL.
-        Positive = User1 is OUTPERFORMING expected
-        Negative = User1 is UNDERPERFORMING expected
-        """
-        if self.user1.day_pnl is not None and self.expected_pnl is not None:
-            return self.user1.day_pnl - self.expected_pnl
-        return None
+class SafeDict(dict):
+    """format_map mapping that renders missing values as N/A."""
 
-    @property
-    def pnl_vs_expected_pct(self) -> Optional[float]:
-        """Percentage deviation from expected PNL."""
-        if self.expected_pnl is not None and self.expected_pnl != 0 and self.pnl_vs_expected is not None:
-            return (self.pnl_vs_expected / abs(self.expected_pnl)) * 100
-        return None
+    def __missing__(self, key):
+        return "N/A"
 
-    @property
-    def actual_pnl_ratio(self) -> Optional[float]:
-        """Actual ratio of User1 PNL to User2 PNL."""
-        if (self.user1.day_pnl is not None and
-            self.user2.day_pnl is not None and
-            self.user2.day_pnl != 0):
-            return self.user1.day_pnl / self.user2.day_pnl
-        return None
 
-    @property
-    def pnl_ratio_efficiency(self) -> Optional[float]:
-        """
-        How well are we tracking the whale's PNL at our target ratio?
-        100% = perfect tracking
-        >100% = outperforming (getting more than expected share of PNL)
-        <100% = underperforming (getting less than expected share)
-        """
-        if self.actual_pnl_ratio is not None and self.scaling_ratio != 0:
-            return (self.actual_pnl_ratio / self.scaling_ratio) * 100
-        return None
+# =============================================================================
+# REPORT TEMPLATES (rendered with str.format_map in print_snapshot)
+# =============================================================================
+SNAPSHOT_HEADER_TEMPLATE = "\n".join([
+    "",
+    "=" * 80,
+    " DIVERGENCE TRACKER | {ts} | SCALING_RATIO = {ratio:.0%}",
+    "=" * 80,
+    f"\n{'Metric':<25} {{label1:>20}} {{label2:>20}} {'Raw Diff':>15}",
+    "-" * 80,
+    f"{'Portfolio Value':<25} {{v1:>20}} {{v2:>20}} {{diff_v:>15}}",
+    f"{'Rolling 24h PNL':<25} {{p1:>20}} {{p2:>20}} {{diff_p:>15}}",
+    f"\n{'─'*80}",
+    " COPY TRADING EFFICIENCY (Target Ratio: {ratio:.0%})",
+    "─" * 80,
+])
+
+EXPECTED_PNL_TEMPLATE = """
+  Expected {label1} PNL:
+    = {label2} PNL × {ratio:.0%}
+    = ${pnl2:+,.2f} × {ratio}
+    = ${epnl:+,.2f}"""
+
+PNL_VS_EXPECTED_TEMPLATE = f"""
+  Actual {{label1}} PNL:    ${{pnl1:+,.2f}}
+  Expected {{label1}} PNL:  ${{epnl:+,.2f}}
+  {'─'*40}
+  PNL vs Expected:        ${{pve:+,.2f}}"""
+
+DEVIATION_TEMPLATE = "  Deviation:              {pve_pct:+.1f}%"
+
+PNL_RATIO_TEMPLATE = """
+  Actual PNL Ratio:       {pnl_ratio:.4f} ({pnl_ratio:.2%})
+  Target PNL Ratio:       {ratio:.4f} ({ratio:.2%})"""
+
+EFFICIENCY_TEMPLATE = """  Copy Efficiency:        {eff:.1f}%
+    (Getting {eff:.0f}% of expected PNL share)"""
+
+LOW_EFFICIENCY_TEMPLATE = """  Copy Efficiency:        {eff:.1f}%
+    (Only getting {eff:.0f}% of expected PNL share)"""
+
+PNL_VS_EXPECTED_STATS_TEMPLATE = """
+  --- PNL vs EXPECTED DISTRIBUTION ({count} points) ---
+  Min / Max:              ${min:+,.2f} / ${max:+,.2f}
+  Mean (std):             ${mean:+,.2f} (${std:,.2f})
+  P5 / P50 / P95:         ${p5:+,.2f} / ${p50:+,.2f} / ${p95:+,.2f}"""
+
+VALUE_RATIO_TEMPLATE = """
+  Portfolio Value Ratio:  {value_ratio:.4f} ({value_ratio:.2%})
+  (Note: Value ratio ≠ scaling ratio due to different base capital)"""
 
 
 class DivergenceTracker:
     """Tracks divergence between two users over time."""
 
     def __init__(self, user1_address: str, user2_address: str,
-                 user1_label: str = "User 1", user2_label: str = "User 2"):
+                 user1_label: str = "User 1", user2_label: str = "User 2",
+                 max_history: int = DEFAULT_MAX_HISTORY):
         self.user1_address = user1_address.lower()
         self.user2_address = user2_address.lower()
         self.user1_label = user1_label
         self.user2_label = user2_label
-        self.history: List[DivergenceSnapshot] = []
+        # Bounded so long sessions don't grow memory (or the saved file) forever
+        self.history: Deque[DivergenceSnapshot] = deque(maxlen=max_history)
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Endpoints are built once; per-call work is only the address query param
+        self._value_url = URL(f"{DATA_API_BASE}/value")
+        self._pnl_url = URL(USER_PNL_API).with_query(
+            interval="1d",   # 1 day of data
+            fidelity="1h",   # hourly data points
+        )
+        # address -> (hour bucket, rolling PNL result); the series is hourly
+        self._pnl_cache: Dict[str, Tuple[int, dict]] = {}
+
+    async def start(self):
+        """Open the shared HTTP session (kept alive across updates)."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=20,
+                limit_per_host=8,
+                keepalive_timeout=75,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=REQUEST_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=15),
+            )
+
+    async def close(self):
+        """Close the shared HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
 
     async def fetch_user_value(self, session: aiohttp.ClientSession,
                                 address: str) -> Optional[float]:
         """Fetch portfolio value for a user."""
-        url = f"{DATA_API_BASE}/value"
-        params = {"user": address}
         try:
-            async with session.get(url, params=params, timeout=15) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    if data and len(data) > 0:
-                        return float(data[0].get("value", 0))
+            data = await get_json_with_retry(session, self._value_url.update_query(user=address))
+            if data and len(data) > 0:
+                return float(data[0].get("value", 0))
         except Exception as e:
             print(f"    Error fetching value for {address[:10]}...: {e}")
         return None
 
     async def fetch_user_rolling_pnl(self, session: aiohttp.ClientSession,
                                       address: str) -> dict:
+        """Rolling 24-hour PNL, refetched at most once per hour per address."""
+        bucket = int(time.time() // 3600)
+        cached = self._pnl_cache.get(address)
+        if cached is not None and cached[0] == bucket:
+            return cached[1]
+
+        result = await self._fetch_user_rolling_pnl(session, address)
+        if result:  # don't cache failures
+            self._pnl_cache[address] = (bucket, result)
+        return result
+
+    async def _fetch_user_rolling_pnl(self, session: aiohttp.ClientSession,
+                                      address: str) -> dict:
         """Fetch rolling 24-hour PNL from user-pnl-api (matches frontend display)."""
-        params = {
-            "user_address": address,
-            "interval": "1d",   # 1 day of data
-            "fidelity": "1h"    # hourly data points
-        }
         try:
-            async with session.get(USER_PNL_API, params=params, timeout=15) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    # Data is array of {"t": timestamp, "p": cumulative_pnl}
-                    # Rolling 24h PNL = latest p - earliest p
-                    if data and len(data) >= 2:
-                        # Sort by timestamp to ensure correct order
-                        sorted_data = sorted(data, key=lambda x: x.get("t", 0))
-                        earliest_pnl = float(sorted_data[0].get("p", 0))
-                        latest_pnl = float(sorted_data[-1].get("p", 0))
-                        rolling_24h_pnl = latest_pnl - earliest_pnl
-                        return {
-                            "pnl": rolling_24h_pnl,
-                            "cumulative_pnl": latest_pnl,
-                            "data_points": len(data),
-                        }
-                    elif data and len(data) == 1:
-                        # Only one data point, PNL change is 0
-                        return {
-                            "pnl": 0.0,
-                            "cumulative_pnl": float(data[0].get("p", 0)),
-                            "data_points": 1,
-                        }
+            data = await get_json_with_retry(session, self._pnl_url.update_query(user_address=address))
+            # Data is array of {"t": timestamp, "p": cumulative_pnl}
+            # Rolling 24h PNL = latest p - earliest p
+            if data and len(data) >= 2:
+                # API returns points in ascending order, which Timsort handles in one pass
+                data = sorted(data, key=lambda x: x.get("t", 0))
+                earliest_pnl = float(data[0].get("p", 0))
+                latest_pnl = float(data[-1].get("p", 0))
+                rolling_24h_pnl = latest_pnl - earliest_pnl
+                return {
+                    "pnl": rolling_24h_pnl,
+                    "cumulative_pnl": latest_pnl,
+                    "data_points": len(data),
+                }
+            elif data and len(data) == 1:
+                # Only one data point, PNL change is 0
+                return {
+                    "pnl": 0.0,
+                    "cumulative_pnl": float(data[0].get("p", 0)),
+                    "data_points": 1,
+                }
         except Exception as e:
             print(f"    Error fetching rolling PNL for {address[:10]}...: {e}")
         return {}
 
-    async def fetch_snapshot(self, session: aiohttp.ClientSession,
-                              address: str, label: str) -> UserSnapshot:
-        """Fetch complete snapshot for a user."""
-        now = datetime.now()
-
-        # Fetch value and rolling 24h PNL in parallel
-        value_task = self.fetch_user_value(session, address)
-        pnl_task = self.fetch_user_rolling_pnl(session, address)
-
-        value, pnl_data = await asyncio.gather(value_task, pnl_task)
-
+    @staticmethod
+    def build_snapshot(address: str, label: str, timestamp: datetime,
+                       value: Optional[float], pnl_data: dict) -> UserSnapshot:
+        """Build a user snapshot from fetched value and rolling PNL data."""
         return UserSnapshot(
             address=address,
             label=label,
-            timestamp=now,
+            timestamp=timestamp,
             portfolio_value=value,
             day_pnl=pnl_data.get("pnl"),
             day_volume=None,  # Not available from this API
@@ -231,14 +370,25 @@ class DivergenceTracker:
 
     async def update(self) -> DivergenceSnapshot:
         """Fetch new snapshots for both users and calculate divergence."""
-        async with aiohttp.ClientSession() as session:
-            user1_snap, user2_snap = await asyncio.gather(
-                self.fetch_snapshot(session, self.user1_address, self.user1_label),
-                self.fetch_snapshot(session, self.user2_address, self.user2_label)
-            )
+        if self._session is None or self._session.closed:
+            await self.start()
+
+        session = self._session
+        now = datetime.now()  # one timestamp shared by both users and the divergence
+
+        # Issue all four requests at once over the shared connection pool
+        value1, pnl1, value2, pnl2 = await asyncio.gather(
+            self.fetch_user_value(session, self.user1_address),
+            self.fetch_user_rolling_pnl(session, self.user1_address),
+            self.fetch_user_value(session, self.user2_address),
+            self.fetch_user_rolling_pnl(session, self.user2_address),
+        )
+
+        user1_snap = self.build_snapshot(self.user1_address, self.user1_label, now, value1, pnl1)
+        user2_snap = self.build_snapshot(self.user2_address, self.user2_label, now, value2, pnl2)
 
         snapshot = DivergenceSnapshot(
-            timestamp=datetime.now(),
+            timestamp=now,
             user1=user1_snap,
             user2=user2_snap
         )
@@ -248,126 +398,108 @@ class DivergenceTracker:
 
     def print_snapshot(self, snap: DivergenceSnapshot, show_change: bool = True):
         """Print a formatted snapshot."""
-        ts = snap.timestamp.strftime("%H:%M:%S")
-
-        # Build output
-        lines = []
-        lines.append("")
-        lines.append(f"{'='*80}")
-        lines.append(f" DIVERGENCE TRACKER | {ts} | SCALING_RATIO = {SCALING_RATIO:.0%}")
-        lines.append(f"{'='*80}")
-
-        # User comparison table
-        lines.append(f"\n{'Metric':<25} {self.user1_label:>20} {self.user2_label:>20} {'Raw Diff':>15}")
-        lines.append("-" * 80)
-
-        # Portfolio Value
-        v1 = f"${snap.user1.portfolio_value:,.2f}" if snap.user1.portfolio_value else "N/A"
-        v2 = f"${snap.user2.portfolio_value:,.2f}" if snap.user2.portfolio_value else "N/A"
-        diff_v = f"${snap.value_divergence:+,.2f}" if snap.value_divergence is not None else "N/A"
-        lines.append(f"{'Portfolio Value':<25} {v1:>20} {v2:>20} {diff_v:>15}")
-
-        # Rolling 24h PNL
-        p1 = f"${snap.user1.day_pnl:+,.2f}" if snap.user1.day_pnl is not None else "N/A"
-        p2 = f"${snap.user2.day_pnl:+,.2f}" if snap.user2.day_pnl is not None else "N/A"
-        diff_p = f"${snap.pnl_divergence:+,.2f}" if snap.pnl_divergence is not None else "N/A"
-        lines.append(f"{'Rolling 24h PNL':<25} {p1:>20} {p2:>20} {diff_p:>15}")
-
-        # =======================================================================
-        # EXPECTED vs ACTUAL ANALYSIS (KEY SECTION)
-        # =======================================================================
-        lines.append(f"\n{'─'*80}")
-        lines.append(f" COPY TRADING EFFICIENCY (Target Ratio: {SCALING_RATIO:.0%})")
-        lines.append(f"{'─'*80}")
-
-        # Expected PNL calculation
-        if snap.expected_pnl is not None:
-            lines.append(f"\n  Expected {self.user1_label} PNL:")
-            lines.append(f"    = {self.user2_label} PNL × {SCALING_RATIO:.0%}")
-            lines.append(f"    = ${snap.user2.day_pnl:+,.2f} × {SCALING_RATIO}")
-            lines.append(f"    = ${snap.expected_pnl:+,.2f}")
-
-        # Actual vs Expected
-        if snap.pnl_vs_expected is not None:
-            lines.append(f"\n  Actual {self.user1_label} PNL:    ${snap.user1.day_pnl:+,.2f}")
-            lines.append(f"  Expected {self.user1_label} PNL:  ${snap.expected_pnl:+,.2f}")
-            lines.append(f"  {'─'*40}")
-            lines.append(f"  PNL vs Expected:        ${snap.pnl_vs_expected:+,.2f}")
-
-            if snap.pnl_vs_expected_pct is not None:
-                lines.append(f"  Deviation:              {snap.pnl_vs_expected_pct:+.1f}%")
-
-            # Interpretation
-            if snap.pnl_vs_expected > 0:
-                lines.append(f"\n  >>> OUTPERFORMING expected by ${snap.pnl_vs_expected:,.2f}")
-            elif snap.pnl_vs_expected < 0:
-                lines.append(f"\n  <<< UNDERPERFORMING expected by ${-snap.pnl_vs_expected:,.2f}")
+        sys.stdout.write(self.format_snapshot(snap, show_change) + "\n")
+
+    def format_snapshot(self, snap: DivergenceSnapshot, show_change: bool = True) -> str:
+        """Render a snapshot report as a single string."""
+        pv1, pv2 = snap.user1.portfolio_value, snap.user2.portfolio_value
+        pnl1, pnl2 = snap.user1.day_pnl, snap.user2.day_pnl
+        vd, pd = snap.value_divergence, snap.pnl_divergence
+        epnl, pve, pve_pct = snap.expected_pnl, snap.pnl_vs_expected, snap.pnl_vs_expected_pct
+        ratio, eff, vr = snap.actual_pnl_ratio, snap.pnl_ratio_efficiency, snap.value_ratio
+
+        # Missing keys render as "N/A"
+        fields = SafeDict(
+            ts=snap.timestamp.strftime("%H:%M:%S"),
+            ratio=SCALING_RATIO,
+            label1=self.user1_label,
+            label2=self.user2_label,
+        )
+        if pv1:
+            fields["v1"] = f"${pv1:,.2f}"
+        if pv2:
+            fields["v2"] = f"${pv2:,.2f}"
+        if vd is not None:
+            fields["diff_v"] = f"${vd:+,.2f}"
+        if pnl1 is not None:
+            fields["p1"] = f"${pnl1:+,.2f}"
+        if pnl2 is not None:
+            fields["p2"] = f"${pnl2:+,.2f}"
+        if pd is not None:
+            fields["diff_p"] = f"${pd:+,.2f}"
+
+        sections = [SNAPSHOT_HEADER_TEMPLATE]
+
+        # Expected vs actual analysis (key section)
+        if epnl is not None:
+            fields.update(pnl2=pnl2, epnl=epnl)
+            sections.append(EXPECTED_PNL_TEMPLATE)
+
+        if pve is not None:
+            fields.update(pnl1=pnl1, pve=pve, pve_pct=pve_pct)
+            sections.append(PNL_VS_EXPECTED_TEMPLATE)
+            if pve_pct is not None:
+                sections.append(DEVIATION_TEMPLATE)
+            if pve > 0:
+                sections.append(f"\n  >>> OUTPERFORMING expected by ${pve:,.2f}")
+            elif pve < 0:
+                sections.append(f"\n  <<< UNDERPERFORMING expected by ${-pve:,.2f}")
             else:
-                lines.append(f"\n  === TRACKING PERFECTLY")
-
-        # PNL Ratio Analysis
-        if snap.actual_pnl_ratio is not None:
-            lines.append(f"\n  Actual PNL Ratio:       {snap.actual_pnl_ratio:.4f} ({snap.actual_pnl_ratio*100:.2f}%)")
-            lines.append(f"  Target PNL Ratio:       {SCALING_RATIO:.4f} ({SCALING_RATIO*100:.2f}%)")
+                sections.append("\n  === TRACKING PERFECTLY")
 
-            if snap.pnl_ratio_efficiency is not None:
-                eff = snap.pnl_ratio_efficiency
-                lines.append(f"  Copy Efficiency:        {eff:.1f}%")
-
-                if eff >= 100:
-                    lines.append(f"    (Getting {eff:.0f}% of expected PNL share)")
-                else:
-                    lines.append(f"    (Only getting {eff:.0f}% of expected PNL share)")
+        # PNL ratio analysis
+        if ratio is not None:
+            fields["pnl_ratio"] = ratio
+            sections.append(PNL_RATIO_TEMPLATE)
+            if eff is not None:
+                fields["eff"] = eff
+                sections.append(EFFICIENCY_TEMPLATE if eff >= 100 else LOW_EFFICIENCY_TEMPLATE)
 
         # Value ratio comparison
-        if snap.value_ratio is not None:
-            pct = snap.value_ratio * 100
-            lines.append(f"\n  Portfolio Value Ratio:  {snap.value_ratio:.4f} ({pct:.2f}%)")
-            lines.append(f"  (Note: Value ratio ≠ scaling ratio due to different base capital)")
+        if vr is not None:
+            fields["value_ratio"] = vr
+            sections.append(VALUE_RATIO_TEMPLATE)
 
         # Change from previous snapshot
         if show_change and len(self.history) >= 2:
-            prev = self.history[-2]
-            lines.append(f"\n  {'─'*60}")
-            lines.append(f"  CHANGE SINCE LAST UPDATE:")
-
-            if snap.user1.portfolio_value and prev.user1.portfolio_value:
-                chg1 = snap.user1.portfolio_value - prev.user1.portfolio_value
-                lines.append(f"    {self.user1_label} Value: ${chg1:+,.2f}")
-
-            if snap.user2.portfolio_value and prev.user2.portfolio_value:
-                chg2 = snap.user2.portfolio_value - prev.user2.portfolio_value
-                lines.append(f"    {self.user2_label} Value: ${chg2:+,.2f}")
-
-            if snap.value_divergence is not None and prev.value_divergence is not None:
-                div_chg = snap.value_divergence - prev.value_divergence
-                lines.append(f"    Divergence Change: ${div_chg:+,.2f}")
+            sections.append(self._delta_section("  CHANGE SINCE LAST UPDATE:", snap, self.history[-2],
+                                                "Value", "Divergence Change"))
 
         # Session summary
         if len(self.history) > 1:
             first = self.history[0]
-            lines.append(f"\n  {'─'*60}")
-            lines.append(f"  SESSION SUMMARY (since {first.timestamp.strftime('%H:%M:%S')}):")
-
-            if snap.user1.portfolio_value and first.user1.portfolio_value:
-                total_chg1 = snap.user1.portfolio_value - first.user1.portfolio_value
-                lines.append(f"    {self.user1_label} Total Change: ${total_chg1:+,.2f}")
-
-            if snap.user2.portfolio_value and first.user2.portfolio_value:
-                total_chg2 = snap.user2.portfolio_value - first.user2.portfolio_value
-                lines.append(f"    {self.user2_label} Total Change: ${total_chg2:+,.2f}")
-
-            if snap.value_divergence is not None and first.value_divergence is not None:
-                total_div_chg = snap.value_divergence - first.value_divergence
-                lines.append(f"    Divergence Total Change: ${total_div_chg:+,.2f}")
-
-        lines.append("")
-        print("\n".join(lines))
+            sections.append(self._delta_section(
+                f"  SESSION SUMMARY (since {first.timestamp.strftime('%H:%M:%S')}):", snap, first,
+                "Total Change", "Divergence Total Change"))
+
+        sections.append("")
+        return "\n".join(section.format_map(fields) for section in sections)
+
+    def _delta_section(self, heading: str, snap: DivergenceSnapshot, base: DivergenceSnapshot,
+                       value_label: str, divergence_label: str) -> str:
+        """Value and divergence changes of `snap` relative to an earlier snapshot."""
+        lines = [f"\n  {'─'*60}", heading]
+        pv1, base_pv1 = snap.user1.portfolio_value, base.user1.portfolio_value
+        pv2, base_pv2 = snap.user2.portfolio_value, base.user2.portfolio_value
+        if pv1 and base_pv1:
+            lines.append(f"    {self.user1_label} {value_label}: ${pv1 - base_pv1:+,.2f}")
+        if pv2 and base_pv2:
+            lines.append(f"    {self.user2_label} {value_label}: ${pv2 - base_pv2:+,.2f}")
+        if snap.value_divergence is not None and base.value_divergence is not None:
+            lines.append(f"    {divergence_label}: ${snap.value_divergence - base.value_divergence:+,.2f}")
+        # Escape braces so user labels survive the final format_map pass
+        return "\n".join(lines).replace("{", "{{").replace("}", "}}")
 
     def print_ascii_chart(self, metric: str = "pnl_vs_expected", width: int = 60):
         """Print ASCII chart of divergence over time."""
+        chart = self.format_ascii_chart(metric, width)
+        if chart:
+            sys.stdout.write(chart + "\n")
+
+    def format_ascii_chart(self, metric: str = "pnl_vs_expected", width: int = 60) -> str:
+        """Render the ASCII chart as a single string ("" if there is too little data)."""
         if len(self.history) < 2:
-            return
+            return ""
 
         # Get values based on metric
         if metric == "pnl_vs_expected":
@@ -387,96 +519,122 @@ class DivergenceTracker:
             title = f"{self.user1_label} Portfolio Value"
 
         if len(values) < 2:
-            return
+            return ""
 
-        min_val = min(values)
-        max_val = max(values)
+        height = 10
+        chart_width = min(len(values), width)
+
+        if np is not None:
+            arr = np.fromiter(values, dtype=np.float64, count=len(values))
+            min_val = float(arr.min())
+            max_val = float(arr.max())
+        else:
+            min_val = min(values)
+            max_val = max(values)
         range_val = max_val - min_val
 
         if range_val == 0:
             range_val = 1  # Avoid division by zero
 
-        height = 10
-        chart_width = min(len(values), width)
-
-        # Sample values if too many
-        if len(values) > chart_width:
-            step = len(values) / chart_width
-            sampled = [values[int(i * step)] for i in range(chart_width)]
+        # Sample values if too many, then render rows top-down
+        if np is not None:
+            if len(arr) > chart_width:
+                step = len(arr) / chart_width
+                sampled = arr[(np.arange(chart_width) * step).astype(np.int64)]
+            else:
+                sampled = arr
+            thresholds = min_val + (np.arange(height, 0, -1) / height) * range_val
+            grid = sampled[None, :] >= thresholds[:, None]
+            rows = ["".join(np.where(cells, "█", " ")) for cells in grid]
         else:
-            sampled = values
+            if len(values) > chart_width:
+                step = len(values) / chart_width
+                sampled = [values[int(i * step)] for i in range(chart_width)]
+            else:
+                sampled = values
+            rows = []
+            for row in range(height, 0, -1):
+                threshold = min_val + (row / height) * range_val
+                rows.append("".join("█" if val >= threshold else " " for val in sampled))
 
-        print(f"\n  {title} (last {len(sampled)} points)")
-        print(f"  Max: ${max_val:+,.0f}" if "efficiency" not in metric else f"  Max: {max_val:+,.1f}%")
+        out = [
+            f"\n  {title} (last {len(sampled)} points)",
+            f"  Max: ${max_val:+,.0f}" if "efficiency" not in metric else f"  Max: {max_val:+,.1f}%",
+        ]
 
         # Build chart
-        for row in range(height, 0, -1):
-            threshold = min_val + (row / height) * range_val
-            line = "  "
-            for val in sampled:
-                if val >= threshold:
-                    line += "█"
-                else:
-                    line += " "
-            if row == height:
+        for i, cells in enumerate(rows):
+            line = "  " + cells
+            if i == 0:
                 line += f" ${max_val:+,.0f}" if "efficiency" not in metric else f" {max_val:+,.1f}%"
-            elif row == 1:
+            elif i == height - 1:
                 line += f" ${min_val:+,.0f}" if "efficiency" not in metric else f" {min_val:+,.1f}%"
-            print(line)
-
-        print(f"  {'─' * len(sampled)}")
-        print(f"  Min: ${min_val:+,.0f}" if "efficiency" not in metric else f"  Min: {min_val:+,.1f}%")
+            out.append(line)
+
+        out.append(f"  {'─' * len(sampled)}")
+        out.append(f"  Min: ${min_val:+,.0f}" if "efficiency" not in metric else f"  Min: {min_val:+,.1f}%")
+        return "\n".join(out)
+
+    # Column name -> snapshot accessor for the columnar history file
+    HISTORY_COLUMNS = {
+        "timestamp": lambda s: s.timestamp.isoformat(),
+        "user1_value": lambda s: s.user1.portfolio_value,
+        "user1_pnl": lambda s: s.user1.day_pnl,
+        "user1_volume": lambda s: s.user1.day_volume,
+        "user1_rank": lambda s: s.user1.rank,
+        "user2_value": lambda s: s.user2.portfolio_value,
+        "user2_pnl": lambda s: s.user2.day_pnl,
+        "user2_volume": lambda s: s.user2.day_volume,
+        "user2_rank": lambda s: s.user2.rank,
+        "value_divergence": attrgetter("value_divergence"),
+        "pnl_divergence": attrgetter("pnl_divergence"),
+        "value_ratio": attrgetter("value_ratio"),
+        "expected_pnl": attrgetter("expected_pnl"),
+        "pnl_vs_expected": attrgetter("pnl_vs_expected"),
+        "pnl_vs_expected_pct": attrgetter("pnl_vs_expected_pct"),
+        "actual_pnl_ratio": attrgetter("actual_pnl_ratio"),
+        "pnl_ratio_efficiency": attrgetter("pnl_ratio_efficiency"),
+    }
 
     def save_history(self, filepath: str = "divergence_history.json"):
-        """Save history to JSON file."""
-        data = []
-        for snap in self.history:
-            data.append({
-                "timestamp": snap.timestamp.isoformat(),
-                "scaling_ratio": snap.scaling_ratio,
-                "user1": {
-                    "address": snap.user1.address,
-                    "label": snap.user1.label,
-                    "portfolio_value": snap.user1.portfolio_value,
-                    "day_pnl": snap.user1.day_pnl,
-                    "day_volume": snap.user1.day_volume,
-                    "rank": snap.user1.rank,
-                },
-                "user2": {
-                    "address": snap.user2.address,
-                    "label": snap.user2.label,
-                    "portfolio_value": snap.user2.portfolio_value,
-                    "day_pnl": snap.user2.day_pnl,
-                    "day_volume": snap.user2.day_volume,
-                    "rank": snap.user2.rank,
-                },
-                "raw_metrics": {
-                    "value_divergence": snap.value_divergence,
-                    "pnl_divergence": snap.pnl_divergence,
-                    "value_ratio": snap.value_ratio,
-                },
-                "expected_metrics": {
-                    "expected_pnl": snap.expected_pnl,
-                    "pnl_vs_expected": snap.pnl_vs_expected,
-                    "pnl_vs_expected_pct": snap.pnl_vs_expected_pct,
-                    "actual_pnl_ratio": snap.actual_pnl_ratio,
-                    "pnl_ratio_efficiency": snap.pnl_ratio_efficiency,
-                },
-            })
-
-        with open(filepath, "w") as f:
-            json.dump(data, f, indent=2)
-        print(f"\n  Saved {len(data)} snapshots to {filepath}")
+        """
+        Save history to JSON file in a columnar layout: one list per metric,
+        index-aligned across columns (loads directly into pandas/numpy).
+        """
+        history = list(self.history)
+        data = {
+            "schema": "soa/v1",
+            "meta": {
+                "scaling_ratio": history[0].scaling_ratio if history else SCALING_RATIO,
+                "user1": {"address": self.user1_address, "label": self.user1_label},
+                "user2": {"address": self.user2_address, "label": self.user2_label},
+                "count": len(history),
+            },
+            "columns": {
+                name: [get(snap) for snap in history]
+                for name, get in self.HISTORY_COLUMNS.items()
+            },
+        }
+
+        if orjson is not None:
+            with open(filepath, "wb") as f:
+                f.write(orjson.dumps(data))
+        else:
+            with open(filepath, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+        print(f"\n  Saved {len(history)} snapshots to {filepath}")
 
 
 async def run_tracker(interval: int = 60, duration: Optional[int] = None,
                        show_chart: bool = True):
     """Run the divergence tracker."""
+    max_history = duration // max(interval, 1) + 16 if duration else DEFAULT_MAX_HISTORY
     tracker = DivergenceTracker(
         user1_address=USER_1_ADDRESS,
         user2_address=USER_2_ADDRESS,
         user1_label=USER_1_LABEL,
         user2_label=USER_2_LABEL,
+        max_history=max_history,
     )
 
     print(f"\nStarting Divergence Tracker")
@@ -491,6 +649,7 @@ async def run_tracker(interval: int = 60, duration: Optional[int] = None,
     start_time = datetime.now()
     update_count = 0
 
+    await tracker.start()
     try:
         while True:
             # Check duration
@@ -503,20 +662,28 @@ async def run_tracker(interval: int = 60, duration: Optional[int] = None,
             # Fetch and display
             print(f"Fetching data... (update #{update_count + 1})")
             snapshot = await tracker.update()
-            tracker.print_snapshot(snapshot)
+            output = [tracker.format_snapshot(snapshot)]
 
             if show_chart and len(tracker.history) > 2:
-                tracker.print_ascii_chart("pnl_vs_expected")
+                chart = tracker.format_ascii_chart("pnl_vs_expected")
+                if chart:
+                    output.append(chart)
 
             update_count += 1
 
+            # One write per tick for report, chart and footer
+            output.append(f"\nNext update in {interval}s...")
+            sys.stdout.write("\n".join(output) + "\n")
+            sys.stdout.flush()
+
             # Wait for next interval
-            print(f"\nNext update in {interval}s...")
             await asyncio.sleep(interval)
 
     except KeyboardInterrupt:
         print("\n\nStopped by user.")
     finally:
+        await tracker.close()
+
         # Save history
         if tracker.history:
             tracker.save_history()
@@ -525,7 +692,7 @@ async def run_tracker(interval: int = 60, duration: Optional[int] = None,
             print(f"\n{'='*80}")
             print(f" FINAL SESSION SUMMARY")
             print(f"{'='*80}")
-            print(f"  Updates: {len(tracker.history)}")
+            print(f"  Updates: {update_count}")
             print(f"  Duration: {(datetime.now() - start_time).total_seconds():.0f}s")
             print(f"  Scaling Ratio: {SCALING_RATIO:.0%}")
 
@@ -552,6 +719,11 @@ async def run_tracker(interval: int = 60, duration: Optional[int] = None,
                     div_change = last.pnl_vs_expected - first.pnl_vs_expected
                     print(f"  PNL vs Expected Change: ${div_change:+,.2f}")
 
+                stats = summarize_series([s.pnl_vs_expected for s in tracker.history
+                                          if s.pnl_vs_expected is not None])
+                if stats:
+                    print(PNL_VS_EXPECTED_STATS_TEMPLATE.format_map(stats))
+
 
 async def run_once():
     """Run a single update and exit."""
@@ -563,7 +735,8 @@ async def run_once():
     )
 
     print(f"\nFetching divergence data...")
-    snapshot = await tracker.update()
+    async with tracker:
+        snapshot = await tracker.update()
     tracker.print_snapshot(snapshot, show_change=False)
     return snapshot
 
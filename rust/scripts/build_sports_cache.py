@@ -13,75 +13,271 @@ Edit crontab with: crontab -e
 """
 
 import asyncio
+import hashlib
 import json
+import os
+import time
+from datetime import datetime
 from pathlib import Path
 import aiohttp
+from yarl import URL
+
+try:
+    import orjson  # optional, much faster than the stdlib json module
+except ImportError:
+    orjson = None
+
+try:
+    from aiolimiter import AsyncLimiter  # optional, smooths request bursts
+except ImportError:
+    AsyncLimiter = None
+
+
+def json_loads(raw):
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+
+def json_dumps_bytes(obj) -> bytes:
+    return orjson.dumps(obj) if orjson else json.dumps(obj).encode()
+
 
 GAMMA_API = "https://gamma-api.polymarket.com"
 GAMES_TAG = "100639"
 CACHE_FILE = ".clob_market_cache.json"
 SLUG_CACHE_FILE = ".clob_slug_cache.json"
+# Run metadata lives in a sidecar file: the Rust loader expects the caches
+# above to be plain token -> value maps.
+META_FILE = ".clob_market_cache.meta.json"
 CONCURRENT_REQUESTS = 5  # tune based on rate limits
+REQUESTS_PER_SECOND = 5
+MAX_RETRIES = 4  # retries on HTTP 429/5xx and network errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_AFTER_MAX = 60  # cap on a server-supplied Retry-After, in seconds
+PAGE_SIZE = 100
+MIN_REFRESH_SECONDS = 300  # skip the run if the last complete run is more recent than this
+FULL_REBUILD_SECONDS = 24 * 3600  # drop stale tokens with a full rebuild once a day
+UPDATED_AT_SLACK = 120  # overlap between incremental runs, covers clock skew
+
+# Fixed part of the events query; only the offset changes per page
+EVENTS_URL = URL(f"{GAMMA_API}/events").with_query(
+    tag_id=GAMES_TAG, active="true", closed="false", limit=PAGE_SIZE,
+    order="updatedAt", ascending="false",
+)
+
+
+def cache_is_fresh(path: str, meta: dict) -> bool:
+    """True if `path` exists, is non-empty and the last complete run was recent.
+
+    Uses `last_run` from the run metadata rather than the file mtime: the caches
+    are also written by runs that failed part way, the metadata is not.
+    """
+    try:
+        st = Path(path).stat()
+    except FileNotFoundError:
+        return False
+    return st.st_size > 2 and time.time() - meta.get("last_run", 0) < MIN_REFRESH_SECONDS
+
+
+def write_atomic(path: str, payload: bytes) -> bool:
+    """Atomically replace `path` with `payload`; returns False if content was unchanged."""
+    p = Path(path)
+    try:
+        if hashlib.blake2b(p.read_bytes()).digest() == hashlib.blake2b(payload).digest():
+            return False
+    except FileNotFoundError:
+        pass
+    tmp = p.with_name(p.name + ".tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, p)
+    return True
+
+
+def load_json(path: str, default):
+    try:
+        return json_loads(Path(path).read_bytes())
+    except (FileNotFoundError, ValueError):
+        return default
+
+
+def parse_updated_at(value) -> float:
+    """Gamma `updatedAt` as a unix timestamp; unparseable values count as new."""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return float("inf")
+
+
+def page_is_stale(page: list, since: float) -> bool:
+    """True if every event on a full page was last updated before `since`."""
+    return (len(page) == PAGE_SIZE and
+            all(parse_updated_at(e.get("updatedAt")) < since for e in page))
+
+
+class _IntervalLimiter:
+    """Fallback for aiolimiter.AsyncLimiter: spaces request starts evenly."""
+
+    def __init__(self, max_rate: float, time_period: float = 1.0):
+        self._interval = time_period / max_rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+                now = self._next
+            self._next = now + self._interval
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+def make_limiter():
+    if AsyncLimiter is not None:
+        return AsyncLimiter(REQUESTS_PER_SECOND, 1)
+    return _IntervalLimiter(REQUESTS_PER_SECOND, 1)
 
 
 async def fetch_page(session: aiohttp.ClientSession, offset: int) -> list:
-    async with session.get(
-        f"{GAMMA_API}/events",
-        params={"tag_id": GAMES_TAG, "active": "true", "closed": "false", "limit": 100, "offset": offset},
-        timeout=aiohttp.ClientTimeout(total=30)
-    ) as resp:
-        return await resp.json()
+    for attempt in range(MAX_RETRIES + 1):
+        last_attempt = attempt == MAX_RETRIES
+        retry_after = ""
+        try:
+            async with session.get(
+                EVENTS_URL.update_query(offset=offset),
+                timeout=aiohttp.ClientTimeout(total=30)
+            ) as resp:
+                if resp.status == 200:
+                    return await resp.json()
+                if resp.status not in RETRY_STATUSES or last_attempt:
+                    # Never hand an error body to the caller as if it were a page
+                    raise aiohttp.ClientResponseError(
+                        resp.request_info, resp.history, status=resp.status,
+                        message=resp.reason or "", headers=resp.headers,
+                    )
+                retry_after = resp.headers.get("Retry-After", "")
+        except aiohttp.ClientResponseError:
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if last_attempt:
+                raise
+        delay = min(float(retry_after), RETRY_AFTER_MAX) if retry_after.isdigit() else 2 ** attempt
+        await asyncio.sleep(delay)
+
+
+async def fetch_batch(session: aiohttp.ClientSession, sem: asyncio.Semaphore, limiter,
+                      start_offset: int, batch_size: int = CONCURRENT_REQUESTS) -> list:
+    """Fetch `batch_size` consecutive pages starting at `start_offset`, in page order."""
+    async def bounded_fetch(offset):
+        async with limiter, sem:
+            return await fetch_page(session, offset)
+
+    return await asyncio.gather(
+        *(bounded_fetch(start_offset + i * PAGE_SIZE) for i in range(batch_size)),
+        return_exceptions=True
+    )
 
 
 async def main():
-    neg_risk_map = {}
-    slug_map = {}
+    meta = load_json(META_FILE, {})
+    if cache_is_fresh(CACHE_FILE, meta):
+        print(f"Cache {CACHE_FILE} is less than {MIN_REFRESH_SECONDS}s old, skipping")
+        return
+
+    run_started = time.time()
+    last_run = meta.get("last_run", 0)
+    incremental = bool(last_run) and run_started - meta.get("last_full", 0) < FULL_REBUILD_SECONDS
+
+    if incremental:
+        # Start from the previous maps and only merge in recently updated events
+        neg_risk_map = load_json(CACHE_FILE, {})
+        slug_map = load_json(SLUG_CACHE_FILE, {})
+        incremental = bool(neg_risk_map)
+    if not incremental:
+        neg_risk_map = {}
+        slug_map = {}
+    since = last_run - UPDATED_AT_SLACK if incremental else 0
     
-    async with aiohttp.ClientSession() as session:
-        # First request to estimate total pages
+    connector = aiohttp.TCPConnector(
+        limit=CONCURRENT_REQUESTS,
+        limit_per_host=CONCURRENT_REQUESTS,
+        keepalive_timeout=60,
+        ttl_dns_cache=600,
+        enable_cleanup_closed=True,
+    )
+    async with aiohttp.ClientSession(
+        connector=connector,
+        headers={"Accept-Encoding": "gzip"},
+        raise_for_status=False,
+    ) as session:
+        # First request to see whether pagination is needed at all
         first_page = await fetch_page(session, 0)
         if not first_page:
             return
         
         # Process first page
         all_events = first_page
+        failed = False
         
-        # Fetch remaining pages concurrently
-        if len(first_page) == 100:
-            # Optimistically fetch next several pages in parallel
-            offsets = list(range(100, 2000, 100))  # adjust max based on typical event count
-            
+        # Fetch remaining pages a batch at a time, stopping at the first short page
+        # (or, when incremental, the first page with nothing updated since last run)
+        if len(first_page) == PAGE_SIZE and not (incremental and page_is_stale(first_page, since)):
             sem = asyncio.Semaphore(CONCURRENT_REQUESTS)
-            
-            async def bounded_fetch(offset):
-                async with sem:
-                    return await fetch_page(session, offset)
-            
-            tasks = [bounded_fetch(o) for o in offsets]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for result in results:
-                if isinstance(result, list) and result:
-                    all_events.extend(result)
-                elif isinstance(result, list) and not result:
-                    break  # empty page, we're done
+            limiter = make_limiter()
+            offset = PAGE_SIZE
+            done = False
+
+            while not done:
+                pages = await fetch_batch(session, sem, limiter, offset)
+                for page in pages:
+                    if not isinstance(page, list):
+                        failed = True
+                        done = True  # failed page, don't skip past it
+                        break
+                    all_events.extend(page)
+                    if len(page) < PAGE_SIZE:
+                        done = True  # short/empty page, we're done
+                        break
+                    if incremental and page_is_stale(page, since):
+                        done = True  # older pages are already cached
+                        break
+                offset += CONCURRENT_REQUESTS * PAGE_SIZE
         
         # Process all events
         for event in all_events:
             neg_risk = event.get("negRisk", False)
             slug = event.get("slug", "")
             for market in event.get("markets", []):
-                token_ids = json.loads(market.get("clobTokenIds", "[]"))
+                raw = market.get("clobTokenIds")
+                token_ids = json_loads(raw) if raw else ()
                 for tid in token_ids:
                     if tid:
                         neg_risk_map[tid] = neg_risk
                         if slug:
                             slug_map[tid] = slug
 
-    Path(CACHE_FILE).write_text(json.dumps(neg_risk_map))
-    Path(SLUG_CACHE_FILE).write_text(json.dumps(slug_map))
+    if failed and not incremental:
+        # A full rebuild cut short by a failed page would drop every token after it:
+        # merge into the previous maps instead (the rebuild stays due, see below)
+        neg_risk_map = {**load_json(CACHE_FILE, {}), **neg_risk_map}
+        slug_map = {**load_json(SLUG_CACHE_FILE, {}), **slug_map}
+
+    write_atomic(CACHE_FILE, json_dumps_bytes(neg_risk_map))
+    write_atomic(SLUG_CACHE_FILE, json_dumps_bytes(slug_map))
+    # A failed page leaves the maps incomplete: keep the previous run metadata so
+    # the next run fetches the same range again (and a due full rebuild stays due)
+    if not failed:
+        write_atomic(META_FILE, json_dumps_bytes({
+            "last_run": run_started,
+            "last_full": meta.get("last_full", 0) if incremental else run_started,
+        }))
 
-    print(f"Cached {len(neg_risk_map)} tokens, {len(slug_map)} slugs")
+    mode = "incremental" if incremental else "full"
+    if failed:
+        mode += ", page fetch failed"
+    print(f"Cached {len(neg_risk_map)} tokens, {len(slug_map)} slugs ({mode}, {len(all_events)} events fetched)")
 
 
 if __name__ == "__main__":
@@ -7,11 +7,37 @@ CRONTAB ENTRY (add to crontab -e):
 0 */4 * * * cd <PROJECT_ROOT>/rust_clob_client && python3 scripts/fetch_categorized_atp.py > /tmp/atp_cache_update.log 2>&1
 """
 
+import gzip
 import json
+import os
+import urllib.error
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 import re
 from datetime import datetime
 
+try:
+    import orjson  # optional, much faster than the stdlib json module
+except ImportError:
+    orjson = None
+
+def json_loads(raw):
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+def json_dumps_bytes(obj) -> bytes:
+    return orjson.dumps(obj) if orjson else json.dumps(obj, separators=(',', ':')).encode()
+
+def write_atomic(path, payload):
+    """Replace `path` with `payload` without readers ever seeing a partial file"""
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp, path)
+
+
+# Game-total lines that mark an O/U market as a match (game) total: 36.5 .. 40.5
+GAME_TOTAL_LINE = re.compile(r'3[6-9]\.5|40\.5')
+
 def categorize_market(question, slug):
     """Categorize market based on question text"""
     q_lower = question.lower()
@@ -25,7 +51,7 @@ def categorize_market(question, slug):
         return 'set_handicap'
     
     # Game totals (Match O/U)
-    if 'match o/u' in q_lower or ('o/u' in q_lower and any(x in question for x in ['36.5', '37.5', '38.5', '39.5', '40.5'])):
+    if 'match o/u' in q_lower or ('o/u' in q_lower and GAME_TOTAL_LINE.search(question)):
         return 'game_totals'
     
     # Set totals
@@ -38,37 +64,118 @@ def categorize_market(question, slug):
     
     return 'other'
 
+EVENTS_URL = "https://gamma-api.polymarket.com/events?tag_id=864&active=true&closed=false&limit={limit}&offset={offset}"
+PAGE_LIMIT = 100
+MAX_PARALLEL_PAGES = 8
+
+# ETag of the last full download, sent back as If-None-Match to skip unchanged runs
+ETAG_FILE = '.atp_etag'
+CACHE_FILES = ('.atp_markets_categorized.json', '.atp_token_categories.json')
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json',
+    'Accept-Encoding': 'gzip',
+}
+
+def fetch_page(offset):
+    """Fetch one page of ATP events"""
+    # Add headers to avoid 403 error
+    req = urllib.request.Request(EVENTS_URL.format(limit=PAGE_LIMIT, offset=offset), headers=REQUEST_HEADERS)
+    with urllib.request.urlopen(req) as response:
+        return read_events(response)
+
+def read_events(response):
+    if response.headers.get('Content-Encoding') == 'gzip':
+        # Decompress while reading instead of holding the compressed body as well
+        return json_loads(gzip.GzipFile(fileobj=response).read())
+    return json_loads(response.read())
+
+def read_etag():
+    """ETag saved by the last run, or None if there is none or the caches are gone"""
+    if not all(os.path.exists(path) for path in CACHE_FILES):
+        return None
+    try:
+        with open(ETAG_FILE) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def save_etag(etag):
+    if etag:
+        write_atomic(ETAG_FILE, etag.encode())
+    else:
+        try:
+            os.remove(ETAG_FILE)
+        except FileNotFoundError:
+            pass
+
+def fetch_first_page(etag):
+    """Fetch the first page, conditionally on `etag`
+
+    Returns (events, etag), or (None, etag) when the server answers 304 Not Modified.
+    """
+    req = urllib.request.Request(EVENTS_URL.format(limit=PAGE_LIMIT, offset=0), headers=REQUEST_HEADERS)
+    if etag:
+        req.add_header('If-None-Match', etag)
+    try:
+        with urllib.request.urlopen(req) as response:
+            return read_events(response), response.headers.get('ETag')
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return None, etag
+        raise
+
+def iter_events(first):
+    """Yield every ATP event, page by page (pages after the first are fetched in parallel)
+
+    `first` is the already fetched first page. Only the pages of the current
+    parallel batch are held in memory at a time.
+    """
+    yield from first
+    if len(first) < PAGE_LIMIT:
+        return
+
+    offset = PAGE_LIMIT
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_PAGES) as pool:
+        while True:
+            pages = list(pool.map(fetch_page, range(offset, offset + MAX_PARALLEL_PAGES * PAGE_LIMIT, PAGE_LIMIT)))
+            last_page = any(len(page) < PAGE_LIMIT for page in pages)
+            for page in pages:
+                yield from page
+            del pages
+            if last_page:
+                return
+            offset += MAX_PARALLEL_PAGES * PAGE_LIMIT
+
 def fetch_categorized_atp():
     """Fetch and categorize all ATP markets"""
     
-    url = "https://gamma-api.polymarket.com/events?tag_id=864&active=true&closed=false&limit=100"
-    
     print("Fetching ATP markets from Polymarket...")
-    
-    # Add headers to avoid 403 error
-    req = urllib.request.Request(url, headers={
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'application/json',
-    })
-    
-    with urllib.request.urlopen(req) as response:
-        events = json.loads(response.read().decode('utf-8'))
-    
-    print(f"Found {len(events)} ATP events")
-    
-    # Categorized structure
+
+    first, etag = fetch_first_page(read_etag())
+    if first is None:
+        print("Upstream unchanged since last run (304 Not Modified), keeping existing cache")
+        return None
+    # The ETag only covers the first page, so it is only trusted when that page is everything
+    if len(first) >= PAGE_LIMIT:
+        etag = None
+    
+    # Categorized structure (dict keys as an insertion-ordered set, deduplicated as tokens arrive)
     categorized = {
-        'moneyline': [],
-        'set_handicap': [],
-        'game_totals': [],
-        'set_totals': [],
-        'tournament_winner': [],
-        'other': []
+        'moneyline': {},
+        'set_handicap': {},
+        'game_totals': {},
+        'set_totals': {},
+        'tournament_winner': {},
+        'other': {}
     }
     
     all_tokens = set()
     
-    for event in events:
+    event_count = 0
+    for event in iter_events(first):
+        event_count += 1
         slug = event.get('slug', '')
         title = event.get('title', '')
         markets = event.get('markets', [])
@@ -79,16 +186,18 @@ def fetch_categorized_atp():
                 clob_tokens_str = market.get('clobTokenIds', '[]')
                 
                 try:
-                    tokens = json.loads(clob_tokens_str)
+                    tokens = json_loads(clob_tokens_str)
                     category = categorize_market(question, slug)
                     
                     for token in tokens:
                         if isinstance(token, str) and len(token) > 20:
                             all_tokens.add(token)
-                            categorized[category].append(token)
+                            categorized[category][token] = None
                 except:
                     pass
     
+    print(f"Found {event_count} ATP events")
+    
     # Print summary
     print("\nMarket Type Distribution:")
     print("=" * 60)
@@ -102,18 +211,17 @@ def fetch_categorized_atp():
         'updated': datetime.now().isoformat(),
         'source': 'gamma-api tag_id=864 (ATP)',
         'categories': {
-            cat: sorted(list(set(tokens)))  # Remove duplicates and sort
+            cat: sorted(tokens)
             for cat, tokens in categorized.items()
         },
         'category_counts': {
-            cat: len(set(tokens))
+            cat: len(tokens)
             for cat, tokens in categorized.items()
         },
         'note': 'ATP markets categorized by type for different buffer strategies'
     }
     
-    with open('.atp_markets_categorized.json', 'w') as f:
-        json.dump(cache_data, f, indent=2)
+    write_atomic('.atp_markets_categorized.json', json_dumps_bytes(cache_data))
     
     print(f"\nSaved to .atp_markets_categorized.json")
     print(f"Total unique tokens: {len(all_tokens)}")
@@ -124,13 +232,17 @@ def fetch_categorized_atp():
         for token in tokens:
             token_to_category[token] = cat
     
-    with open('.atp_token_categories.json', 'w') as f:
-        json.dump(token_to_category, f, indent=2)
+    write_atomic('.atp_token_categories.json', json_dumps_bytes(token_to_category))
     
+    # Saved last, so an interrupted run never leaves an ETag pointing at stale caches
+    save_etag(etag)
+
     return cache_data
 
 if __name__ == "__main__":
     cache = fetch_categorized_atp()
+    if cache is None:
+        raise SystemExit(0)
     
     print("\n" + "=" * 60)
     print("ATP MARKETS CATEGORIZATION COMPLETE")
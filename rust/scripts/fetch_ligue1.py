@@ -7,30 +7,134 @@ CRONTAB ENTRY (add to crontab -e):
 */30 * * * * cd <PROJECT_ROOT>/rust_clob_client && python3 scripts/fetch_ligue1.py > /tmp/ligue1_cache_update.log 2>&1
 """
 
+import gzip
 import json
+import os
+import urllib.error
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+try:
+    import orjson  # optional, much faster than the stdlib json module
+except ImportError:
+    orjson = None
+
+def json_loads(raw):
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+def json_dumps_bytes(obj) -> bytes:
+    return orjson.dumps(obj) if orjson else json.dumps(obj, separators=(',', ':')).encode()
+
+def write_atomic(path, payload):
+    """Replace `path` with `payload` without readers ever seeing a partial file"""
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp, path)
+
+EVENTS_URL = "https://gamma-api.polymarket.com/events?tag_id=102070&active=true&closed=false&limit={limit}&offset={offset}"
+PAGE_LIMIT = 100
+MAX_PARALLEL_PAGES = 8
+
+# ETag of the last full download, sent back as If-None-Match to skip unchanged runs
+ETAG_FILE = '.ligue1_etag'
+CACHE_FILES = ('.ligue1_tokens.json',)
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json',
+    'Accept-Encoding': 'gzip',
+}
+
+def fetch_page(offset):
+    """Fetch one page of Ligue 1 events"""
+    # Add headers to avoid 403 error
+    req = urllib.request.Request(EVENTS_URL.format(limit=PAGE_LIMIT, offset=offset), headers=REQUEST_HEADERS)
+    with urllib.request.urlopen(req) as response:
+        return read_events(response)
+
+def read_events(response):
+    if response.headers.get('Content-Encoding') == 'gzip':
+        # Decompress while reading instead of holding the compressed body as well
+        return json_loads(gzip.GzipFile(fileobj=response).read())
+    return json_loads(response.read())
+
+def read_etag():
+    """ETag saved by the last run, or None if there is none or the caches are gone"""
+    if not all(os.path.exists(path) for path in CACHE_FILES):
+        return None
+    try:
+        with open(ETAG_FILE) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def save_etag(etag):
+    if etag:
+        write_atomic(ETAG_FILE, etag.encode())
+    else:
+        try:
+            os.remove(ETAG_FILE)
+        except FileNotFoundError:
+            pass
+
+def fetch_first_page(etag):
+    """Fetch the first page, conditionally on `etag`
+
+    Returns (events, etag), or (None, etag) when the server answers 304 Not Modified.
+    """
+    req = urllib.request.Request(EVENTS_URL.format(limit=PAGE_LIMIT, offset=0), headers=REQUEST_HEADERS)
+    if etag:
+        req.add_header('If-None-Match', etag)
+    try:
+        with urllib.request.urlopen(req) as response:
+            return read_events(response), response.headers.get('ETag')
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return None, etag
+        raise
+
+def iter_events(first):
+    """Yield every Ligue 1 event, page by page (pages after the first are fetched in parallel)
+
+    `first` is the already fetched first page. Only the pages of the current
+    parallel batch are held in memory at a time.
+    """
+    yield from first
+    if len(first) < PAGE_LIMIT:
+        return
+
+    offset = PAGE_LIMIT
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_PAGES) as pool:
+        while True:
+            pages = list(pool.map(fetch_page, range(offset, offset + MAX_PARALLEL_PAGES * PAGE_LIMIT, PAGE_LIMIT)))
+            last_page = any(len(page) < PAGE_LIMIT for page in pages)
+            for page in pages:
+                yield from page
+            del pages
+            if last_page:
+                return
+            offset += MAX_PARALLEL_PAGES * PAGE_LIMIT
+
 def fetch_ligue1_tokens():
     """Fetch all Ligue 1 market tokens"""
 
-    url = "https://gamma-api.polymarket.com/events?tag_id=102070&active=true&closed=false&limit=100"
-
     print("Fetching Ligue 1 markets from Polymarket...")
 
-    req = urllib.request.Request(url, headers={
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'application/json',
-    })
-
-    with urllib.request.urlopen(req) as response:
-        events = json.loads(response.read().decode('utf-8'))
-
-    print(f"Found {len(events)} Ligue 1 events")
+    first, etag = fetch_first_page(read_etag())
+    if first is None:
+        print("Upstream unchanged since last run (304 Not Modified), keeping existing cache")
+        return None
+    # The ETag only covers the first page, so it is only trusted when that page is everything
+    if len(first) >= PAGE_LIMIT:
+        etag = None
 
     all_tokens = set()
 
-    for event in events:
+    event_count = 0
+    for event in iter_events(first):
+        event_count += 1
         markets = event.get('markets', [])
 
         for market in markets:
@@ -38,24 +142,30 @@ def fetch_ligue1_tokens():
                 clob_tokens_str = market.get('clobTokenIds', '[]')
 
                 try:
-                    tokens = json.loads(clob_tokens_str)
+                    tokens = json_loads(clob_tokens_str)
                     for token in tokens:
                         if isinstance(token, str) and len(token) > 20:
                             all_tokens.add(token)
                 except:
                     pass
 
+    print(f"Found {event_count} Ligue 1 events")
+
     # Save as simple list for Rust to load
     token_list = sorted(list(all_tokens))
 
-    with open('.ligue1_tokens.json', 'w') as f:
-        json.dump(token_list, f, indent=2)
+    write_atomic('.ligue1_tokens.json', json_dumps_bytes(token_list))
 
     print(f"Saved {len(token_list)} tokens to .ligue1_tokens.json")
     print(f"Updated: {datetime.now().isoformat()}")
 
+    # Saved last, so an interrupted run never leaves an ETag pointing at stale caches
+    save_etag(etag)
+
     return token_list
 
 if __name__ == "__main__":
     tokens = fetch_ligue1_tokens()
+    if tokens is None:
+        raise SystemExit(0)
     print(f"\nLigue 1 cache ready with {len(tokens)} tokens")